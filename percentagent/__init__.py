@@ -1,7 +1,38 @@
+import importlib
+
 from percentagent.extract_patterns import TimeLocaleSet
-from percentagent.guess_format import DateParser
+from percentagent.guess_format import DateParser, ParseResult, ParseSession
+from percentagent.planner import AdaptivePlanner
+from percentagent.slowlog import SlowLog
 
 __all__ = (
+    'AdaptivePlanner',
+    'ColumnFormat',
     'DateParser',
+    'FormatCensus',
+    'FormatCount',
+    'ParseResult',
+    'ParseSession',
+    'SlowLog',
     'TimeLocaleSet',
+    'format_census',
+    'infer_columns',
 )
+
+# These pull in csv and multiprocessing, which most users of the parser
+# don't need, so they're only imported when first used.
+_lazy = {
+    'ColumnFormat': 'percentagent.columns',
+    'infer_columns': 'percentagent.columns',
+    'FormatCensus': 'percentagent.census',
+    'FormatCount': 'percentagent.census',
+    'format_census': 'percentagent.census',
+}
+
+def __getattr__(name):
+    module = _lazy.get(name)
+    if module is None:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
@@ -1,4 +1,8 @@
 import cmd
+from collections import Counter
+import cProfile
+import pstats
+import time
 from percentagent import TimeLocaleSet, DateParser
 
 class TimeShell(cmd.Cmd):
@@ -8,15 +12,103 @@ class TimeShell(cmd.Cmd):
     def __init__(self, *args, **kwargs):
         super(TimeShell, self).__init__(*args, **kwargs)
         self.parser = DateParser()
+        self.last = None
+
+    def _parse(self, s):
+        """
+        Parse `s`, remembering what it cost for the `stats` command.
+        """
+
+        stats = Counter()
+        start = time.perf_counter()
+        results = self.parser.parse(s, stats=stats)
+        elapsed = time.perf_counter() - start
+        self.last = (s, elapsed, len(results), stats)
+        return results
 
     def do_guess(self, arg):
         """Guess the format and locale for a date and/or time string."""
-        for fmt, value, locales in self.parser.parse(arg):
+        for fmt, value, locales in self._parse(arg):
             print("format: {!r}".format(fmt))
             print("value: {}".format(value))
             print("locales: {}".format(' '.join(sorted(locales or ["C"]))))
             print()
 
+    def do_time(self, arg):
+        """Report parse times over 100 repeats: time [-n REPEATS] <input>"""
+        repeats = 100
+        if arg.startswith("-n "):
+            count, _, arg = arg[3:].lstrip().partition(" ")
+            try:
+                repeats = int(count)
+            except ValueError:
+                print("*** not a number of repeats: {!r}".format(count))
+                return
+            if repeats < 1:
+                print("*** need at least one repeat")
+                return
+
+        times = []
+        for _ in range(repeats):
+            self._parse(arg)
+            times.append(self.last[1])
+        times.sort()
+
+        def percentile(p):
+            return times[min(len(times) - 1, int(p * len(times)))]
+        print("{} parses: min {:.2f}ms, median {:.2f}ms, 90% {:.2f}ms, 99% {:.2f}ms, max {:.2f}ms".format(
+            repeats,
+            *(1000 * t for t in (times[0], percentile(0.5), percentile(0.9), percentile(0.99), times[-1]))
+        ))
+
+    def do_load(self, arg):
+        """Parse each line of a file; report throughput and the slowest lines."""
+        try:
+            with open(arg, encoding="utf-8") as f:
+                lines = [line.strip() for line in f]
+        except OSError as e:
+            print("*** {}".format(e))
+            return
+        lines = [line for line in lines if line]
+        if not lines:
+            print("*** no input in {}".format(arg))
+            return
+
+        timings = []
+        total = Counter()
+        for line in lines:
+            self._parse(line)
+            s, elapsed, results, stats = self.last
+            timings.append((elapsed, s, results, stats["expanded"]))
+            total.update(stats)
+
+        elapsed = sum(t[0] for t in timings)
+        print("{} lines in {:.2f}s: {:.0f} parses/s, {:.1f} states expanded per parse".format(
+            len(lines), elapsed, len(lines) / elapsed, total["expanded"] / len(lines)))
+        print("slowest:")
+        timings.sort(key=lambda t: t[0], reverse=True)
+        for elapsed, s, results, expanded in timings[:10]:
+            print("{:8.2f}ms {:5} states {:3} results  {!r}".format(1000 * elapsed, expanded, results, s))
+
+    def do_stats(self, arg):
+        """Show search and token-table statistics for the most recent parse."""
+        if self.last is None:
+            print("*** nothing parsed yet")
+            return
+        s, elapsed, results, stats = self.last
+        print("input: {!r}".format(s))
+        print("time: {:.2f}ms".format(1000 * elapsed))
+        print("results: {}".format(results))
+        print("search states: {} expanded, {} generated".format(stats["expanded"], stats["generated"]))
+        print("tokens: {}, {} not in the token table of {} entries".format(
+            stats["tokens"], stats["analyzed"], len(self.parser._tokens)))
+
+    def do_profile(self, arg):
+        """Show a cProfile summary of parsing a string once."""
+        profiler = cProfile.Profile()
+        profiler.runcall(self._parse, arg)
+        pstats.Stats(profiler).strip_dirs().sort_stats("cumulative").print_stats(25)
+
     def do_exit(self, arg):
         """Exit the shell."""
         return True
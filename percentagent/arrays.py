@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+
+"""
+Convert many strings which share one format into NumPy arrays.
+
+This module requires NumPy, which is an optional dependency of this package.
+"""
+
+import re
+
+import numpy as np
+
+from percentagent.extract_patterns import TimeLocaleSet
+
+class Datetime64Converter(object):
+    """
+    Convert strings in a single known format, such as one inferred by
+    :py:meth:`DateParser.parse`, into a :py:class:`numpy.ndarray` of
+    ``datetime64`` values.
+
+    Each string is matched against one regular expression; everything else,
+    including keyword lookups and calendar checks, happens on whole columns of
+    fields at once. Like :py:meth:`DateParser.parse`, two-digit years without
+    a century are placed using the POSIX rule, unless a weekday name pins them
+    down, and ``%p`` requires a 12-hour clock.
+
+    >>> convert = Datetime64Converter('%Y-%m-%d %H:%M:%S')
+    >>> values, valid = convert(["2018-01-09 04:45:18", "2018-02-30 00:00:00"])
+    >>> print(values)
+    ['2018-01-09T04:45:18'                 'NaT']
+    >>> print(valid)
+    [ True False]
+
+    Dates without times become ``datetime64[D]``, and times without dates
+    become ``timedelta64[s]`` since midnight.
+
+    >>> Datetime64Converter('%d/%m/%y')(["9/1/18", "9/1/69"])[0]
+    array(['2018-01-09', '1969-01-09'], dtype='datetime64[D]')
+    >>> Datetime64Converter('%H:%M %p', TimeLocaleSet(
+    ...     am_pm={"AM;PM": ["en_US"]},
+    ... ))(["12:30 am", "4:45 PM"])[0]
+    array([ 1800, 60300], dtype='timedelta64[s]')
+
+    Formats with only part of a date or time, or neither, can't be
+    converted:
+
+    >>> Datetime64Converter('%m/%d')
+    Traceback (most recent call last):
+        ...
+    ValueError: can't convert '%m/%d' to datetime64 without a year, month, and day
+    >>> Datetime64Converter('%z')
+    Traceback (most recent call last):
+        ...
+    ValueError: can't convert '%z' to datetime64 because it has no date or time
+
+    :param str fmt: format string, as returned by :py:meth:`DateParser.parse`
+    :param TimeLocaleSet locale_set: where to look up names of days, months,
+        and so on; defaults to :py:meth:`TimeLocaleSet.default`, which is
+        loaded only if the format needs it
+    :param locales: only accept names used in these locales, or in any locale
+        if :py:obj:`None`
+    :raises ValueError: if `fmt` doesn't describe a whole date, a time with
+        at least hours and minutes, or both
+    """
+
+    _conversion = re.compile(r'%(O?[a-zA-Z])')
+    _whitespace = re.compile(r'(\s+)')
+    _number = r'(\d{1,2})'
+
+    def __init__(self, fmt, locale_set=None, locales=None):
+        self.fmt = fmt
+        self.locales = locales
+
+        tokens = self._conversion.split(fmt.replace("%Y", "%C%y"))
+        pattern = []
+        self._fields = []
+        for idx, token in enumerate(tokens):
+            if idx % 2 == 0:
+                pattern.extend(
+                    r'\s+' if piece.isspace() else re.escape(piece)
+                    for piece in self._whitespace.split(token)
+                    if piece
+                )
+                continue
+
+            category = token[-1]
+            if category == "z":
+                pattern.append(r'([+-]\d{4})')
+                self._fields.append(("z", None))
+            elif category in "abpZ" or token[0] == "O":
+                if locale_set is None:
+                    locale_set = TimeLocaleSet.default()
+                words = self._keyword_values(locale_set, token[0], locales)
+                pattern.append('(' + '|'.join(map(re.escape, sorted(words, key=len, reverse=True))) + ')')
+                if category == "b":
+                    # Month names are just another way to write month numbers.
+                    category = "m"
+                self._fields.append((category, words))
+            else:
+                pattern.append(self._number)
+                self._fields.append((category, None))
+
+        self.compiled = re.compile(''.join(pattern), re.I)
+
+        categories = set(category for category, _ in self._fields)
+        self._date_present = not categories.isdisjoint("Cymda")
+        self._time_present = not categories.isdisjoint("HMSp")
+        if self._date_present and not categories.issuperset("ymd"):
+            raise ValueError("can't convert {!r} to datetime64 without a year, month, and day".format(fmt))
+        if self._time_present and not categories.issuperset("HM"):
+            raise ValueError("can't convert {!r} to datetime64 without hours and minutes".format(fmt))
+        if not self._date_present and not self._time_present:
+            raise ValueError("can't convert {!r} to datetime64 because it has no date or time".format(fmt))
+
+    @staticmethod
+    def _keyword_values(locale_set, fmt, locales):
+        """
+        Map each keyword that `fmt` may produce in the given locales to its
+        value. Keywords which mean different things in different locales map
+        to :py:obj:`None`, because we can't tell which is intended.
+        """
+
+        words = {}
+        for word, entries in locale_set.keywords.items():
+            for entry_fmt, value, entry_locales in entries:
+                if entry_fmt != fmt:
+                    continue
+                if entry_locales and locales is not None and locales.isdisjoint(entry_locales):
+                    continue
+                if fmt == "Z":
+                    value = 0
+                if words.setdefault(word, value) != value:
+                    words[word] = None
+        return words
+
+    def __call__(self, strings):
+        """
+        Convert a sequence of strings.
+
+        :return: the converted values, with ``NaT`` wherever the string didn't
+            match the format or didn't describe a valid date or time; and a
+            boolean array which is true wherever the conversion succeeded
+        :rtype: tuple(numpy.ndarray, numpy.ndarray)
+        """
+
+        fullmatch = self.compiled.fullmatch
+        missing = ("",) * len(self._fields)
+        matches = [fullmatch(s) for s in strings]
+        valid = np.fromiter((m is not None for m in matches), dtype=bool, count=len(matches))
+        groups = np.array([m.groups() if m else missing for m in matches], dtype=str).reshape(len(matches), len(self._fields))
+
+        fields = {}
+        for column, (category, words) in zip(groups.T, self._fields):
+            if category == "z":
+                # Offsets are recognized, but datetime64 has no notion of
+                # timezones, so unlike in DateParser.parse, they don't affect
+                # the reported value.
+                continue
+            unique, inverse = np.unique(column, return_inverse=True)
+            if words is None:
+                values = [int(v) if v else -1 for v in unique]
+            else:
+                values = [words.get(v.casefold()) for v in unique]
+                values = [-1 if v is None else v for v in values]
+            fields[category] = np.array(values, dtype=np.int64)[inverse.reshape(-1)]
+
+        if "Z" in fields:
+            del fields["Z"]
+        valid &= np.all([v >= 0 for v in fields.values()], axis=0) if fields else True
+
+        result = None
+        if self._date_present:
+            days, ok = self._days(fields)
+            valid &= ok
+            result = days
+
+        if self._time_present:
+            seconds, ok = self._seconds(fields)
+            valid &= ok
+            if result is None:
+                result = seconds
+            else:
+                result = result.astype("M8[s]") + seconds
+
+        result[~valid] = np.array("NaT").astype(result.dtype)
+        return result, valid
+
+    @staticmethod
+    def _days(fields):
+        y = fields["y"]
+        m = fields["m"]
+        d = fields["d"]
+        a = fields.get("a")
+        ok = (y <= 99) & (1 <= m) & (m <= 12) & (1 <= d) & (d <= 31)
+        m = np.where(ok, m, 1)
+        d = np.where(ok, d, 1)
+
+        def to_days(C):
+            year = C * 100 + y
+            months = (year - 1970) * 12 + (m - 1)
+            first = months.astype("M8[M]").astype("M8[D]")
+            days = first + (d - 1)
+            # Day-of-month overflow lands in the following month.
+            return days, (year >= 1) & (days.astype("M8[M]") == first.astype("M8[M]"))
+
+        def weekday(days):
+            # 1970-01-01 was a Thursday; %a counts from Sunday.
+            return (days.astype(np.int64) + 4) % 7
+
+        if "C" in fields:
+            C = fields["C"]
+            ok &= C <= 99
+            days, fits = to_days(C)
+            ok &= fits
+            if a is not None:
+                ok &= weekday(days) == a
+            return days, ok
+
+        if a is None:
+            # The current POSIX rule for how strptime interprets two-digit
+            # years.
+            C = np.where(y <= 68, 20, 19)
+        else:
+            # If we know the weekday, a two-digit year is unambiguous within
+            # a four-century window around the 20th/21st centuries.
+            C = np.full_like(y, -1)
+            for century in (20, 19, 21, 18):
+                days, fits = to_days(century)
+                C = np.where((C < 0) & fits & (weekday(days) == a), century, C)
+            ok &= C >= 0
+            C = np.where(C < 0, 20, C)
+
+        # Among years divisible by 100, only those that are also divisible by
+        # 400 are leap years, so 2000 is the only nearby year with Feb 29.
+        C = np.where((y == 0) & (m == 2) & (d == 29), 20, C)
+        days, fits = to_days(C)
+        ok &= fits
+        if a is not None:
+            ok &= weekday(days) == a
+        return days, ok
+
+    @staticmethod
+    def _seconds(fields):
+        H = fields["H"]
+        M = fields["M"]
+        S = fields.get("S", 0)
+        ok = (M <= 59) & (S <= 59)
+        p = fields.get("p")
+        if p is None:
+            ok &= H <= 23
+        else:
+            # 12am is 00:00, and 12pm is 12:00
+            ok &= (1 <= H) & (H <= 12)
+            H = (H % 12) + 12 * p
+        return (H * 3600 + M * 60 + S).astype("m8[s]"), ok
+
+def to_datetime64(strings, fmt, locales=None, locale_set=None):
+    """
+    Convert a sequence of strings which share one format into a NumPy array.
+    This is a shortcut for constructing a :py:class:`Datetime64Converter` and
+    calling it once; construct one yourself to convert several batches.
+
+    >>> from percentagent import DateParser
+    >>> parser = DateParser(TimeLocaleSet(mon={
+    ...     "Jan;Feb;Mar;Apr;May;Jun;Jul;Aug;Sep;Oct;Nov;Dec": ["en_US"],
+    ... }))
+    >>> [(fmt, locales)] = [(fmt, locales) for fmt, _, locales in parser.parse("2018Jan9")]
+    >>> to_datetime64(["2018Jan9", "2019dec31", "2019Foo1"], fmt, locales, parser.locale_set)
+    (array(['2018-01-09', '2019-12-31',        'NaT'], dtype='datetime64[D]'), array([ True,  True, False]))
+
+    :param strings: the strings to convert
+    :param str fmt: format string, as returned by :py:meth:`DateParser.parse`
+    :param locales: locales, as returned by :py:meth:`DateParser.parse`
+    :param TimeLocaleSet locale_set: where to look up names of days, months,
+        and so on
+    :return: converted values and a mask of which conversions succeeded
+    :rtype: tuple(numpy.ndarray, numpy.ndarray)
+    """
+
+    return Datetime64Converter(fmt, locale_set, locales)(strings)
+
+if __name__ == "__main__":
+    import random
+    import time
+    from percentagent import DateParser
+
+    rng = random.Random(0)
+    strings = [
+        "{}/{}/{} {}:{:02}:{:02}".format(
+            rng.randint(1, 28), rng.randint(1, 12), rng.randint(1950, 2050),
+            rng.randint(1, 23), rng.randint(1, 59), rng.randint(1, 59),
+        )
+        for _ in range(200000)
+    ]
+
+    parser = DateParser()
+    fmt, _, locales = parser.parse("13/1/2018 4:45:18")[0]
+
+    start = time.perf_counter()
+    for s in strings[:2000]:
+        parser.parse(s)
+    elapsed = (time.perf_counter() - start) / 2000
+    print("parse(): {:.2f}us/row".format(elapsed * 1e6))
+
+    convert = Datetime64Converter(fmt, parser.locale_set, locales)
+    start = time.perf_counter()
+    values, valid = convert(strings)
+    elapsed = (time.perf_counter() - start) / len(strings)
+    print("{!r}: {:.2f}us/row, {} valid".format(fmt, elapsed * 1e6, valid.sum()))
@@ -0,0 +1,371 @@
+"""
+A read-only binary format for the tables in a
+:py:class:`~percentagent.TimeLocaleSet`, designed to be used in place through
+:py:mod:`mmap`.
+
+Nothing in the file needs to be parsed before use: every table is a packed
+array or a blob of UTF-8 strings, and lookups hash the UTF-8 encoding of the
+pattern (with :py:func:`zlib.crc32`) into an open-addressing table stored in
+the file. Because the file is mapped read-only, every process which loads the
+same file shares one copy of it in the operating system's page cache.
+
+Timezone abbreviations are stored the same way, each mapped to a run of UTC
+offsets in seconds.
+
+The file starts with a header listing named sections:
+
+- 8 bytes: magic number
+- 4 bytes: number of sections, N
+- N times: 8-byte section name, 1-byte :py:mod:`array` type code, 7 bytes of
+  padding, 8-byte offset, and 8-byte length
+
+All integers are in the byte order of the machine that wrote the file, which
+is recorded in the magic number.
+"""
+
+from array import array
+from collections.abc import Mapping
+from datetime import timedelta
+import mmap
+import struct
+import sys
+from zlib import crc32
+
+_MAGIC = {
+    "little": b"%agent\x02l",
+    "big": b"%agent\x02b",
+}
+_count = struct.Struct("=I")
+_section = struct.Struct("=8sc7xQQ")
+_ALIGN = 8
+
+def _string_table(strings):
+    blob = bytearray()
+    offsets = array('I', [0])
+    for s in strings:
+        blob += s.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+def _hash_table(keys):
+    size = 1
+    while size < 2 * len(keys):
+        size *= 2
+    mask = size - 1
+    slots = array('I', bytes(4 * size))
+    for idx, key in enumerate(keys):
+        h = crc32(key) & mask
+        while slots[h]:
+            h = (h + 1) & mask
+        slots[h] = idx + 1
+    return slots
+
+def _keyed_sections(prefix, keys):
+    keyoffsets = array('I', [0])
+    for key in keys:
+        keyoffsets.append(keyoffsets[-1] + len(key))
+    return [
+        (prefix + b"keyoff", keyoffsets),
+        (prefix + b"keyblb", b"".join(keys)),
+        (prefix + b"hash", _hash_table(keys)),
+    ]
+
+def write(f, index, tables, tz_offsets):
+    """
+    Write a locale index and tables to a binary file.
+
+    :param f: file opened for writing in binary mode
+    :param index: the locale index which the tables refer to
+    :param tables: pairs of a one-character table name and a table which
+        provides ``slot`` and ``entries`` methods
+    :param tz_offsets: mapping from timezone abbreviations to tuples of
+        :py:class:`datetime.timedelta`
+    """
+
+    strings = []
+    string_ids = {}
+
+    def encode_value(value):
+        if not isinstance(value, str):
+            return value
+        string_id = string_ids.get(value)
+        if string_id is None:
+            string_id = string_ids[value] = len(strings)
+            strings.append(value)
+        return ~string_id
+
+    sections = []
+    offsets, blob = _string_table(index.names[i] for i in range(len(index.names)))
+    sections.append((b"names.of", offsets))
+    sections.append((b"names.bl", blob))
+    sections.append((b"sets.mem", index.members))
+    sections.append((b"sets.off", index.offsets))
+
+    for name, table in tables:
+        # Sorting by UTF-8 encoding is the same as sorting by code point.
+        keys = sorted(pattern.encode("utf-8") for pattern in table)
+        starts = array('I')
+        counts = array('H')
+        fmts = array('B')
+        values = array('h')
+        localesets = array('H')
+        for key in keys:
+            entries = table.entries(table.slot(key.decode("utf-8")))
+            starts.append(len(fmts))
+            counts.append(len(entries))
+            for entry, set_id in entries:
+                fmts.append(ord(entry[0]))
+                if len(entry) > 1:
+                    values.append(encode_value(entry[1]))
+                localesets.append(set_id)
+
+        prefix = name.encode("ascii") + b"."
+        sections.extend(_keyed_sections(prefix, keys))
+        sections.append((prefix + b"start", starts))
+        sections.append((prefix + b"count", counts))
+        sections.append((prefix + b"fmt", fmts))
+        if values:
+            sections.append((prefix + b"value", values))
+        sections.append((prefix + b"lsid", localesets))
+
+    keys = sorted(tzname.encode("utf-8") for tzname in tz_offsets)
+    starts = array('I')
+    counts = array('H')
+    seconds = array('i')
+    for key in keys:
+        starts.append(len(seconds))
+        offsets = tz_offsets[key.decode("utf-8")]
+        counts.append(len(offsets))
+        seconds.extend(int(offset.total_seconds()) for offset in offsets)
+    sections.extend(_keyed_sections(b"z.", keys))
+    sections.append((b"z.start", starts))
+    sections.append((b"z.count", counts))
+    sections.append((b"z.offset", seconds))
+
+    offsets, blob = _string_table(strings)
+    sections.append((b"strs.off", offsets))
+    sections.append((b"strs.blb", blob))
+
+    magic = _MAGIC[sys.byteorder]
+    pos = len(magic) + _count.size + _section.size * len(sections)
+    directory = []
+    for name, data in sections:
+        # struct would silently truncate longer names.
+        assert len(name) <= 8, name
+        pos = -(-pos // _ALIGN) * _ALIGN
+        if isinstance(data, bytes):
+            typecode = 'B'
+        elif isinstance(data, array):
+            typecode = data.typecode
+            data = data.tobytes()
+        else:
+            typecode = data.format
+            data = data.tobytes()
+        directory.append((name, typecode.encode("ascii"), pos, data))
+        pos += len(data)
+
+    f.write(magic)
+    f.write(_count.pack(len(directory)))
+    for name, typecode, offset, data in directory:
+        f.write(_section.pack(name, typecode, offset, len(data)))
+    pos = len(magic) + _count.size + _section.size * len(directory)
+    for name, typecode, offset, data in directory:
+        f.write(bytes(offset - pos))
+        f.write(data)
+        pos = offset + len(data)
+
+def load(path):
+    """
+    Map a file written by :py:func:`write` into memory.
+
+    :return: a locale index and a dictionary of tables by name
+    """
+
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic = mapped[:8]
+    if magic != _MAGIC[sys.byteorder]:
+        if magic in _MAGIC.values():
+            raise ValueError("{}: written on a machine with different byte order".format(path))
+        if magic[:6] == b"%agent":
+            raise ValueError("{}: written by an incompatible version of percentagent".format(path))
+        raise ValueError("{}: not a percentagent locale table".format(path))
+
+    view = memoryview(mapped)
+    (count,) = _count.unpack_from(mapped, 8)
+    sections = {}
+    for idx in range(count):
+        name, typecode, offset, length = _section.unpack_from(mapped, 8 + _count.size + idx * _section.size)
+        data = view[offset:offset + length]
+        if typecode != b'B':
+            data = data.cast(typecode.decode("ascii"))
+        sections[name.rstrip(b"\0").decode("ascii")] = data
+
+    index = _MappedLocaleIndex(sections)
+    tables = {}
+    for name in set(name.split(".", 1)[0] for name in sections if name.endswith(".lsid")):
+        tables[name] = _MappedTable(index, sections, name)
+    tables["z"] = _MappedOffsets(sections, "z")
+    return index, tables
+
+class _MappedStrings(object):
+    __slots__ = ("offsets", "blob", "cache")
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+        self.cache = [None] * (len(offsets) - 1)
+
+    def __len__(self):
+        return len(self.cache)
+
+    def __getitem__(self, idx):
+        s = self.cache[idx]
+        if s is None:
+            s = self.cache[idx] = str(self.blob[self.offsets[idx]:self.offsets[idx + 1]], "utf-8")
+        return s
+
+class _MappedLocaleIndex(object):
+    """
+    The read-only counterpart of :py:class:`_LocaleIndex`, backed by a mapped
+    file. Locale names and string values are decoded on first use.
+    """
+
+    def __init__(self, sections):
+        self.names = _MappedStrings(sections["names.of"], sections["names.bl"])
+        self.members = sections["sets.mem"]
+        self.offsets = sections["sets.off"]
+        self.strings = _MappedStrings(sections["strs.off"], sections["strs.blb"])
+        self._sections = sections
+
+    def localeset(self, set_id):
+        names = self.names
+        return tuple([names[i] for i in self.members[self.offsets[set_id]:self.offsets[set_id + 1]]])
+
+    def decode_value(self, value):
+        if value < 0:
+            return self.strings[~value]
+        return value
+
+    def memory_report(self):
+        def size(*names):
+            return sum(self._sections[name].nbytes for name in names)
+        return {
+            "locales": size("names.of", "names.bl"),
+            "localesets": size("sets.mem", "sets.off"),
+            "strings": size("strs.off", "strs.blb"),
+        }
+
+class _MappedKeys(Mapping):
+    """
+    Hash lookups of UTF-8 keys in a mapped file, shared by the mapped tables.
+    Subclasses say what a key maps to by implementing ``_decode(slot)``.
+    """
+
+    def __init__(self, sections, name):
+        get = lambda suffix: sections.get(name + "." + suffix)
+        self._keyoffsets = get("keyoff")
+        self._keys = get("keyblb")
+        self._hash = get("hash")
+        self._mask = len(self._hash) - 1
+        self._starts = get("start")
+        self._counts = get("count")
+
+    def slot(self, pattern):
+        key = pattern.encode("utf-8")
+        keyoffsets = self._keyoffsets
+        mask = self._mask
+        h = crc32(key) & mask
+        while True:
+            idx = self._hash[h]
+            if not idx:
+                return None
+            idx -= 1
+            if self._keys[keyoffsets[idx]:keyoffsets[idx + 1]] == key:
+                return idx
+            h = (h + 1) & mask
+
+    def __getitem__(self, pattern):
+        slot = self.slot(pattern)
+        if slot is None:
+            raise KeyError(pattern)
+        return self._decode(slot)
+
+    def get(self, pattern, default=None):
+        slot = self.slot(pattern)
+        if slot is None:
+            return default
+        return self._decode(slot)
+
+    def __contains__(self, pattern):
+        return self.slot(pattern) is not None
+
+    def __iter__(self):
+        keyoffsets = self._keyoffsets
+        keys = self._keys
+        for idx in range(len(keyoffsets) - 1):
+            yield str(keys[keyoffsets[idx]:keyoffsets[idx + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self._keyoffsets) - 1
+
+    def _sections(self):
+        return (self._keyoffsets, self._keys, self._hash, self._starts, self._counts)
+
+    def memory_report(self):
+        return sum(data.nbytes for data in self._sections() if data is not None)
+
+class _MappedTable(_MappedKeys):
+    """
+    The read-only counterpart of :py:class:`_PackedTable`, backed by a mapped
+    file.
+    """
+
+    def __init__(self, index, sections, name):
+        super().__init__(sections, name)
+        self._index = index
+        self._name = name
+        get = lambda suffix: sections.get(name + "." + suffix)
+        self._fmts = get("fmt")
+        self._values = get("value")
+        self._localesets = get("lsid")
+
+    def entries(self, slot):
+        start = self._starts[slot]
+        end = start + self._counts[slot]
+        fmts = map(chr, self._fmts[start:end])
+        localesets = self._localesets[start:end]
+        if self._values is None:
+            return [((fmt,), set_id) for fmt, set_id in zip(fmts, localesets)]
+        decode_value = self._index.decode_value
+        values = map(decode_value, self._values[start:end])
+        return [((fmt, value), set_id) for fmt, value, set_id in zip(fmts, values, localesets)]
+
+    def _decode(self, slot):
+        localeset = self._index.localeset
+        return tuple([
+            key + (localeset(set_id),)
+            for key, set_id in self.entries(slot)
+        ])
+
+    def _sections(self):
+        return super()._sections() + (self._fmts, self._values, self._localesets)
+
+class _MappedOffsets(_MappedKeys):
+    """
+    The read-only counterpart of :py:attr:`TimeLocaleSet.tz_offsets`, backed
+    by a mapped file.
+    """
+
+    def __init__(self, sections, name):
+        super().__init__(sections, name)
+        self._offsets = sections[name + ".offset"]
+
+    def _decode(self, slot):
+        start = self._starts[slot]
+        end = start + self._counts[slot]
+        return tuple([timedelta(seconds=seconds) for seconds in self._offsets[start:end]])
+
+    def _sections(self):
+        return super()._sections() + (self._offsets,)
@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+
+"""
+Count which formats appear across a whole corpus of timestamps, in memory
+that doesn't grow with the size of the corpus.
+
+Most strings in a large corpus have the same *shape* as many others: the
+same text once every digit is replaced by 0, and numbers which could fill
+the same conversions, such as any day of the month past the 12th. Strings
+with the same shape can only differ in which formats explain them if some
+of their values are invalid, like February 30th. A :py:class:`FormatCensus`
+counts shapes, as :py:meth:`DateParser.shape` describes them, which takes
+a few dictionary lookups per string, and keeps a small random sample of
+the strings with each shape. Only the samples are parsed. Each format's
+count is then estimated from how many strings had each shape and how many
+of that shape's samples the format explains.
+
+The number of distinct shapes is capped. Past the cap, shapes are counted
+approximately with the Misra-Gries algorithm, which keeps every shape that
+is more common than a fraction of the corpus and never overestimates a
+count. Censuses of separate parts of a corpus can be merged into a census
+of the whole, which is how :py:func:`format_census` spreads the work across
+processes.
+"""
+
+from collections import defaultdict, namedtuple
+import itertools
+import multiprocessing
+import os
+import queue
+import random
+
+from percentagent.guess_format import DateParser
+from percentagent.sampling import Reservoir
+
+FormatCount = namedtuple("FormatCount", (
+    "format",
+    "locales",
+    "count",
+    "shapes",
+    "examples",
+))
+FormatCount.__doc__ = """
+How often one format appeared in a :py:class:`FormatCensus`.
+
+:param format: a format string, or :py:obj:`None` for strings that didn't
+    look like a date or time
+:param locales: the locales that format was found for, or :py:obj:`None`
+    if any locale will do
+:param int count: estimated number of strings that the format explains;
+    a string which several formats explain counts toward each of them
+:param int shapes: how many distinct shapes the format explained
+:param examples: some of the sampled strings that the format explains
+:type examples: tuple(str)
+"""
+
+class FormatCensus(object):
+    """
+    Count the formats of a stream of timestamps.
+
+    >>> from percentagent import TimeLocaleSet
+    >>> census = FormatCensus(DateParser(TimeLocaleSet()), seed=1)
+    >>> census.update(["2018-01-09", "2018-05-13", "21:04:56", "2018-05-14", "n/a"])
+    >>> for row in census.most_common():
+    ...     print(row)
+    FormatCount(format='%Y-%m-%d', locales=None, count=3, shapes=2, examples=('2018-01-09', '2018-05-13', '2018-05-14'))
+    FormatCount(format='%H:%M:%S', locales=None, count=1, shapes=1, examples=('21:04:56',))
+    FormatCount(format='%Y-%d-%m', locales=None, count=1, shapes=1, examples=('2018-01-09',))
+    FormatCount(format=None, locales=None, count=1, shapes=1, examples=('n/a',))
+
+    :param DateParser parser: the parser to parse samples with; by default,
+        one with the default locale set
+    :param int max_shapes: how many distinct shapes to count exactly; past
+        that, counts are lower bounds, off by at most :py:attr:`error`
+    :param int samples: how many strings of each shape to parse
+    :param int examples: how many example strings to report per format
+    :param seed: seed for sampling, for reproducible results
+    """
+
+    def __init__(self, parser=None, max_shapes=10000, samples=4, examples=3, seed=None):
+        if parser is None:
+            parser = DateParser()
+        self.parser = parser
+        self.max_shapes = max_shapes
+        self.samples = samples
+        self.examples = examples
+        #: how many strings have been counted
+        self.total = 0
+        #: how much the count of any one shape may have been reduced to stay
+        #: within :py:attr:`max_shapes`
+        self.error = 0
+        self._rng = random.Random(seed)
+        self._counts = {}
+        self._samples = {}
+        # sampled string -> the (format, locales) pairs which explain it
+        self._candidates = {}
+
+    def __getstate__(self):
+        # Each process has its own parser, and the locale tables are big, so
+        # don't send them along.
+        state = dict(self.__dict__)
+        state["parser"] = None
+        return state
+
+    def add(self, s):
+        """
+        Count one string.
+        """
+
+        shape = self.parser.shape(s)
+        self.total += 1
+        count = self._counts.get(shape)
+        if count is None:
+            self._counts[shape] = 1
+            self._samples[shape] = reservoir = Reservoir(self.samples)
+            reservoir.add(s, self._rng)
+            if len(self._counts) > self.max_shapes:
+                self._prune()
+        else:
+            self._counts[shape] = count + 1
+            self._samples[shape].add(s, self._rng)
+
+    def update(self, strings):
+        """
+        Count each of several strings.
+        """
+
+        for s in strings:
+            self.add(s)
+
+    def _prune(self):
+        # Misra-Gries, decrementing by enough to free half the table at
+        # once so that the cost of pruning is spread over many new shapes.
+        cut = sorted(self._counts.values(), reverse=True)[self.max_shapes // 2]
+        for shape, count in list(self._counts.items()):
+            if count > cut:
+                self._counts[shape] = count - cut
+            else:
+                del self._counts[shape]
+                del self._samples[shape]
+        self.error += cut
+
+    def merge(self, other):
+        """
+        Add the counts from another census, such as one of a different part
+        of the same corpus, to this one.
+
+        :param FormatCensus other: a census with the same settings
+        """
+
+        rng = self._rng
+        for shape, count in other._counts.items():
+            theirs = other._samples[shape]
+            mine = self._counts.get(shape)
+            if mine is None:
+                self._counts[shape] = count
+                self._samples[shape] = theirs
+            else:
+                self._counts[shape] = mine + count
+                self._samples[shape] = self._samples[shape].merge(theirs, rng)
+        self._candidates.update(other._candidates)
+        self.total += other.total
+        self.error += other.error
+        if len(self._counts) > self.max_shapes:
+            self._prune()
+
+    def resolve(self):
+        """
+        Parse any samples that haven't been parsed yet, and forget the
+        parses of strings that are no longer sampled.
+        """
+
+        parse = self.parser.parse
+        candidates = {}
+        for reservoir in self._samples.values():
+            for s in reservoir.values:
+                if s in candidates:
+                    continue
+                found = self._candidates.get(s)
+                if found is None:
+                    found = frozenset((fmt, locales) for fmt, value, locales in parse(s))
+                candidates[s] = found
+        self._candidates = candidates
+
+    def most_common(self, n=None):
+        """
+        :param int n: how many formats to report; by default, all of them
+        :return: formats from most to least common
+        :rtype: list(FormatCount)
+        """
+
+        self.resolve()
+        counts = defaultdict(float)
+        shapes = defaultdict(int)
+        examples = defaultdict(list)
+        for shape, count in self._counts.items():
+            values = self._samples[shape].values
+            weight = count / len(values)
+            found = defaultdict(list)
+            for s in values:
+                for key in self._candidates[s] or ((None, None),):
+                    found[key].append(s)
+            for key, matched in found.items():
+                counts[key] += weight * len(matched)
+                shapes[key] += 1
+                for s in sorted(matched):
+                    if len(examples[key]) >= self.examples:
+                        break
+                    if s not in examples[key]:
+                        examples[key].append(s)
+
+        rows = sorted(
+            (
+                FormatCount(fmt, locales, round(count), shapes[fmt, locales], tuple(examples[fmt, locales]))
+                for (fmt, locales), count in counts.items()
+            ),
+            key=lambda row: (-row.count, row.format is None, row.format or "", sorted(row.locales or ())),
+        )
+        return rows[:n]
+
+def format_census(strings, locale_set=None, processes=None, chunk_size=10000, **kwargs):
+    """
+    Take a census of the formats in a stream of strings, spread across
+    worker processes.
+
+    Each worker counts the chunks of the stream it's handed and parses its
+    samples once at the end, and then the workers' censuses are merged.
+    Only a few chunks are read ahead of the workers, so the stream can be
+    much larger than memory.
+
+    :param strings: iterable of texts which contain dates and/or times
+    :param TimeLocaleSet locale_set: locales to consider when parsing
+    :param int processes: worker processes to spread the stream across;
+        defaults to the number of CPUs, and 1 counts in the calling process
+    :param int chunk_size: how many strings to hand a worker at a time
+    :param kwargs: as for the :py:class:`FormatCensus` constructor
+    :rtype: FormatCensus
+    """
+
+    census = FormatCensus(DateParser(locale_set), **kwargs)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes == 1:
+        census.update(strings)
+        census.resolve()
+        return census
+
+    strings = iter(strings)
+    tasks = multiprocessing.Queue(2 * processes)
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=_census_worker, args=(locale_set, kwargs, tasks, results), daemon=True)
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        while True:
+            chunk = list(itertools.islice(strings, chunk_size))
+            if not chunk:
+                break
+            tasks.put(chunk)
+        for worker in workers:
+            tasks.put(None)
+
+        pending = processes
+        while pending:
+            try:
+                census.merge(results.get(timeout=1))
+                pending -= 1
+            except queue.Empty:
+                if any(worker.exitcode not in (None, 0) for worker in workers):
+                    raise RuntimeError("a census worker process failed")
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+    census.resolve()
+    return census
+
+def _census_worker(locale_set, kwargs, tasks, results):
+    census = FormatCensus(DateParser(locale_set), **kwargs)
+    for chunk in iter(tasks.get, None):
+        census.update(chunk)
+    census.resolve()
+    results.put(census)
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    argparser = argparse.ArgumentParser(description="Count the date/time formats in a file with one timestamp per line.")
+    argparser.add_argument("file", nargs="?", type=argparse.FileType("r", encoding="utf-8"), default=sys.stdin)
+    argparser.add_argument("-p", "--processes", type=int)
+    argparser.add_argument("--max-shapes", type=int, default=10000)
+    argparser.add_argument("--samples", type=int, default=4)
+    argparser.add_argument("--top", type=int, default=20)
+    argparser.add_argument("--seed", type=int)
+    args = argparser.parse_args()
+
+    with args.file:
+        lines = (line.strip() for line in args.file)
+        census = format_census(
+            (line for line in lines if line),
+            processes=args.processes,
+            max_shapes=args.max_shapes,
+            samples=args.samples,
+            seed=args.seed,
+        )
+
+    print("{} strings, {} shapes{}".format(
+        census.total,
+        len(census._counts),
+        ", counts may be low by up to {} per shape".format(census.error) if census.error else "",
+    ))
+    for row in census.most_common(args.top):
+        print("{:10} {:6.1%} {!r} {} e.g. {}".format(
+            row.count,
+            row.count / census.total,
+            row.format,
+            ' '.join(sorted(row.locales or ["C"])),
+            ', '.join(map(repr, row.examples)),
+        ))
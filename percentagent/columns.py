@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+
+from collections import Counter, namedtuple
+import csv
+import multiprocessing
+import random
+
+from percentagent.extract_patterns import TimeLocaleSet
+from percentagent.guess_format import DateParser
+from percentagent.sampling import Reservoir
+
+ColumnFormat = namedtuple("ColumnFormat", (
+    "column",
+    "format",
+    "locales",
+    "conformance",
+    "sampled",
+))
+ColumnFormat.__doc__ = """
+The format inferred for one column of a delimited text file.
+
+:param column: the column's name from the header row, or its index
+:param format: the format string which explains the most sampled values, or
+    :py:obj:`None` if no sampled value looked like a date or time
+:param locales: locales consistent with every sampled value that
+    :py:attr:`format` explains, or :py:obj:`None` if any locale will do
+:param conformance: the fraction of sampled values that :py:attr:`format`
+    explains
+:param sampled: how many non-empty values were parsed before the column's
+    candidates converged
+"""
+
+def infer_columns(f, locale_set=None, sample_size=1000, patience=50, processes=None, header=True, seed=None, **fmtparams):
+    """
+    Infer which columns of a CSV/TSV stream hold dates or times, and in what
+    format.
+
+    The stream is read once, keeping only a fixed-size random sample of each
+    column, so memory use does not depend on the length of the file. Each
+    column's sample is then parsed until the set of format strings that
+    explain every value parsed so far stops changing for `patience`
+    consecutive values.
+
+    >>> import io
+    >>> data = io.StringIO("when,count\\n2018-01-09,3\\n2018-05-13,4\\n")
+    >>> for column in infer_columns(data, TimeLocaleSet(), processes=1):
+    ...     print(column)
+    ColumnFormat(column='when', format='%Y-%m-%d', locales=None, conformance=1.0, sampled=2)
+    ColumnFormat(column='count', format=None, locales=None, conformance=0.0, sampled=2)
+
+    Extra keyword arguments are passed to :py:func:`csv.reader`, so use
+    ``delimiter="\\t"`` for tab-separated files.
+
+    :param f: text stream to read rows from
+    :param TimeLocaleSet locale_set: locales to consider when parsing values
+    :param int sample_size: maximum number of values to keep per column
+    :param int patience: how long the candidate formats must stay unchanged
+        before giving up on the rest of a column's sample
+    :param int processes: worker processes to spread columns across; defaults
+        to the number of CPUs, and 1 parses in the calling process
+    :param bool header: whether the first row names the columns
+    :param seed: seed for the random sampling, for reproducible results
+    :return: one result per column, in column order
+    :rtype: list(ColumnFormat)
+    """
+
+    rng = random.Random(seed)
+    rows = csv.reader(f, **fmtparams)
+    names = []
+    if header:
+        names = next(rows, [])
+
+    reservoirs = []
+    for row in rows:
+        if len(row) > len(reservoirs):
+            reservoirs.extend(Reservoir(sample_size) for _ in range(len(row) - len(reservoirs)))
+        for reservoir, value in zip(reservoirs, row):
+            value = value.strip()
+            if value:
+                reservoir.add(value, rng)
+
+    columns = list(zip(names, reservoirs))
+    columns.extend(enumerate(reservoirs[len(names):], len(names)))
+    if len(names) > len(reservoirs):
+        columns.extend((name, Reservoir(0)) for name in names[len(reservoirs):])
+
+    work = []
+    for column, reservoir in columns:
+        # Parse the sample in random order so that early termination doesn't
+        # favor whatever happened to be at the beginning of the file.
+        rng.shuffle(reservoir.values)
+        work.append((column, reservoir.values, patience))
+
+    if processes == 1 or len(work) <= 1:
+        _init_worker(locale_set)
+        return list(map(_infer_column, work))
+
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(locale_set,)) as pool:
+        return pool.map(_infer_column, work, chunksize=1)
+
+_worker_parser = None
+
+def _init_worker(locale_set):
+    global _worker_parser
+    _worker_parser = DateParser(locale_set)
+
+def _infer_column(work):
+    column, values, patience = work
+    parse = _worker_parser.parse
+
+    counts = Counter()
+    locales = {}
+    consistent = None
+    stable = 0
+    sampled = 0
+    cache = {}
+
+    for value in values:
+        fmts = cache.get(value)
+        if fmts is None:
+            fmts = {}
+            for fmt, _, found in parse(value):
+                # Several results may share a format string but differ in
+                # value or locales; any of them explains this sample.
+                if fmt not in fmts:
+                    fmts[fmt] = found
+                elif fmts[fmt] is not None and found is not None:
+                    fmts[fmt] = fmts[fmt] | found
+                else:
+                    fmts[fmt] = None
+            cache[value] = fmts
+
+        sampled += 1
+        counts.update(fmts.keys())
+        for fmt, found in fmts.items():
+            if found is None:
+                locales.setdefault(fmt, None)
+            elif locales.get(fmt) is None:
+                locales[fmt] = found
+            else:
+                locales[fmt] = locales[fmt] & found
+
+        narrowed = frozenset(fmts) if consistent is None else consistent.intersection(fmts)
+        if narrowed == consistent:
+            stable += 1
+            if stable >= patience:
+                break
+        else:
+            consistent = narrowed
+            stable = 0
+
+    if not counts:
+        return ColumnFormat(column=column, format=None, locales=None, conformance=0.0, sampled=sampled)
+
+    fmt, count = counts.most_common(1)[0]
+    return ColumnFormat(
+        column=column,
+        format=fmt,
+        locales=locales[fmt],
+        conformance=count / sampled,
+        sampled=sampled,
+    )
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    argparser = argparse.ArgumentParser(description="Infer date/time formats of CSV/TSV columns.")
+    argparser.add_argument("file", nargs="?", type=argparse.FileType("r", encoding="utf-8"), default=sys.stdin)
+    argparser.add_argument("-d", "--delimiter", help="field separator (default: tab for *.tsv, otherwise comma)")
+    argparser.add_argument("-n", "--sample-size", type=int, default=1000)
+    argparser.add_argument("-p", "--processes", type=int)
+    argparser.add_argument("--no-header", dest="header", action="store_false")
+    argparser.add_argument("--seed", type=int)
+    args = argparser.parse_args()
+
+    delimiter = args.delimiter
+    if delimiter is None:
+        delimiter = "\t" if args.file.name.endswith(".tsv") else ","
+
+    with args.file:
+        results = infer_columns(
+            args.file,
+            sample_size=args.sample_size,
+            processes=args.processes,
+            header=args.header,
+            seed=args.seed,
+            delimiter=delimiter,
+        )
+
+    for column in results:
+        if column.format is None:
+            continue
+        print("{}: {!r} ({:.0%} of {} sampled) {}".format(
+            column.column,
+            column.format,
+            column.conformance,
+            column.sampled,
+            ' '.join(sorted(column.locales or ["C"])),
+        ))
@@ -1,21 +1,220 @@
 #!/usr/bin/env python
 
-from collections import defaultdict
+from array import array
+from collections import OrderedDict, defaultdict
+from collections.abc import Mapping
 import json
 from pkg_resources import resource_stream
 import pytz
 import re
+import sys
 
-class _InternTable(dict):
+from percentagent import binary_tables
+
+class _LocaleIndex(object):
+    """
+    Compact storage shared by all the tables of a :py:class:`TimeLocaleSet`.
+
+    Each locale name is stored once and referred to by a small integer id.
+    Each distinct set of locales is stored once, as a run of locale ids in a
+    packed array, and referred to by its own integer id. Keyword values which
+    aren't small integers, such as timezone abbreviations, are likewise stored
+    once and referred to by (negative) id.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self.members = array('H')
+        self.offsets = array('I', [0])
+        self.sets = {}
+        self.strings = []
+        self.string_ids = {}
+
+    def localeset_id(self, locales):
+        ids = array('H')
+        for name in sorted(locales):
+            locale_id = self.ids.get(name)
+            if locale_id is None:
+                locale_id = self.ids[name] = len(self.names)
+                self.names.append(name)
+            ids.append(locale_id)
+        key = ids.tobytes()
+        set_id = self.sets.get(key)
+        if set_id is None:
+            set_id = self.sets[key] = len(self.offsets) - 1
+            self.members.extend(ids)
+            self.offsets.append(len(self.members))
+        return set_id
+
+    def localeset(self, set_id):
+        names = self.names
+        return tuple([names[i] for i in self.members[self.offsets[set_id]:self.offsets[set_id + 1]]])
+
+    def encode_value(self, value):
+        if not isinstance(value, str):
+            return value
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = self.string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return ~string_id
+
+    def decode_value(self, value):
+        if value < 0:
+            return self.strings[~value]
+        return value
+
+    def memory_report(self):
+        return {
+            "locales": _sizeof(self.names) + _sizeof(self.ids),
+            "localesets": _sizeof(self.members) + _sizeof(self.offsets) + _sizeof(self.sets),
+            "strings": _sizeof(self.strings) + _sizeof(self.string_ids),
+        }
+
+class _PackedTable(Mapping):
     """
-    A callable which returns a value equal to its argument, but if it's called
-    twice with equivalent values, it always returns the object that was passed
-    to it first. As long as the objects are immutable, this saves memory
-    without changing the behavior of the program.
+    A read-only mapping from patterns to tuples of entries, where each entry
+    is a tuple of a conversion specifier character, optionally a value, and a
+    tuple of locale names. Entries are stored in packed arrays and only turned
+    back into tuples when looked up.
+
+    The arrays, and the mapping from patterns to slots in them, are kept
+    together in one tuple which :py:meth:`store` only ever appends to or
+    replaces whole, so lookups from other threads always see a consistent
+    table.
     """
 
-    def __call__(self, v):
-        return self.setdefault(v, v)
+    # Compact once abandoned rows and slots outnumber live ones, but don't
+    # bother for small tables.
+    _min_dead = 4096
+
+    def __init__(self, index, has_values):
+        self._index = index
+        self._has_values = has_values
+        self._dead = 0
+        self._state = self._empty()
+
+    def _empty(self):
+        # slots, starts, counts, fmts, values, localesets
+        return ({}, array('I'), array('H'), array('B'), array('h') if self._has_values else None, array('H'))
+
+    def __getitem__(self, pattern):
+        state = self._state
+        return self._decode(state, state[0][pattern])
+
+    def get(self, pattern, default=None):
+        state = self._state
+        slot = state[0].get(pattern)
+        if slot is None:
+            return default
+        return self._decode(state, slot)
+
+    def __contains__(self, pattern):
+        return pattern in self._state[0]
+
+    def __iter__(self):
+        return iter(self._state[0])
+
+    def __len__(self):
+        return len(self._state[0])
+
+    def _decode(self, state, slot):
+        localeset = self._index.localeset
+        return tuple([
+            key + (localeset(set_id),)
+            for key, set_id in self._entries(state, slot)
+        ])
+
+    def slot(self, pattern):
+        """
+        :return: the slot holding the entries for `pattern`, which is only
+            valid until the next call to :py:meth:`store`; or
+            :py:obj:`None` if there are no entries for it
+        """
+
+        return self._state[0].get(pattern)
+
+    def entries(self, slot):
+        """
+        :return: the entries stored in `slot`, as pairs of a key tuple and a
+            locale-set id
+        """
+
+        return self._entries(self._state, slot)
+
+    def _entries(self, state, slot):
+        _, starts, counts, fmts, values, localesets = state
+        start = starts[slot]
+        end = start + counts[slot]
+        fmts = map(chr, fmts[start:end])
+        localesets = localesets[start:end]
+        if values is None:
+            return [((fmt,), set_id) for fmt, set_id in zip(fmts, localesets)]
+        decode_value = self._index.decode_value
+        values = map(decode_value, values[start:end])
+        return [((fmt, value), set_id) for fmt, value, set_id in zip(fmts, values, localesets)]
+
+    def store(self, pattern, entries):
+        """
+        Replace all the entries for `pattern` with `entries`, which are pairs
+        of a key tuple and a locale-set id. The new rows are appended under a
+        new slot, and only then is the pattern pointed at that slot, so a
+        concurrent lookup sees either the old entries or the new ones. The
+        old rows are reclaimed once enough of them have been abandoned.
+        """
+
+        state = self._state
+        slots, starts, counts, fmts, values, localesets = state
+        self._append(state, entries)
+        old = slots.get(pattern)
+        slots[pattern] = len(starts) - 1
+        if old is not None:
+            self._dead += counts[old] + 1
+            if self._dead > self._min_dead and 2 * self._dead > len(fmts) + len(starts):
+                self._compact()
+
+    def _append(self, state, entries):
+        _, starts, counts, fmts, values, localesets = state
+        start = len(fmts)
+        encode_value = self._index.encode_value
+        for key, set_id in entries:
+            fmts.append(ord(key[0]))
+            if values is not None:
+                values.append(encode_value(key[1]))
+            localesets.append(set_id)
+        starts.append(start)
+        counts.append(len(entries))
+
+    def _compact(self):
+        """
+        Copy the live entries into fresh arrays, leaving behind the rows that
+        :py:meth:`store` abandoned, and publish them all at once.
+        """
+
+        old = self._state
+        new = self._empty()
+        for pattern, slot in old[0].items():
+            self._append(new, self._entries(old, slot))
+            new[0][pattern] = len(new[1]) - 1
+        self._state = new
+        self._dead = 0
+
+    def memory_report(self):
+        return sum(map(_sizeof, self._state))
+
+def _sizeof(obj):
+    """
+    Approximate the memory used by a container and the objects it holds,
+    without descending further than one level.
+    """
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in obj.items())
+    elif isinstance(obj, list):
+        size += sum(map(sys.getsizeof, obj))
+    return size
 
 class TimeLocaleSet(object):
     """
@@ -47,10 +246,86 @@ class TimeLocaleSet(object):
             return cls.from_json(f)
 
     @classmethod
-    def _localized_conversion(cls, uniq, keywords, fmt, offset, d):
+    def from_binary(cls, path):
+        """
+        Load a locale set from a file written by :py:meth:`write_binary`.
+
+        The file is mapped into memory and used in place, so loading it is
+        nearly instantaneous, and processes which load the same file share a
+        single copy of its contents. The result is read-only until you call
+        :py:meth:`add_keywords` or :py:meth:`add_formats`, which first copy the
+        whole set into ordinary memory.
+
+        Constructing a :py:class:`DateParser` from the result is not free,
+        though: the parser still compiles a regular expression matching
+        every keyword, prefix, and suffix, which takes a good fraction of a
+        second for the bundled locales. That is less than loading the JSON
+        and building the parser both, but each process pays it for its own
+        parser, so construct one per process and reuse it.
+
+        :param str path: the file to load
+        :return: the loaded locale set
+        """
+
+        index, tables = binary_tables.load(path)
+        self = cls.__new__(cls)
+        self._index = index
+        self._keywords = tables["k"]
+        self._prefixes = tables["p"]
+        self._suffixes = tables["s"]
+        self._tz_offsets = tables["z"]
+        self._changes = OrderedDict()
+        self._generation = 0
+        return self
+
+    def write_binary(self, f):
+        """
+        Save this locale set in a compact binary format which
+        :py:meth:`from_binary` can load without parsing it.
+
+        >>> import os, tempfile
+        >>> fd, path = tempfile.mkstemp()
+        >>> with os.fdopen(fd, "wb") as f:
+        ...     TimeLocaleSet(mon={"Jan;Feb;Mar": ["en_US"]}).write_binary(f)
+        >>> mapped = TimeLocaleSet.from_binary(path)
+        >>> mapped.keywords['feb']
+        (('b', 2, ('en_US',)),)
+        >>> del mapped; os.unlink(path)
+
+        :param f: a file opened for writing in binary mode
+        """
+
+        binary_tables.write(f, self._index, (
+            ("k", self._keywords),
+            ("p", self._prefixes),
+            ("s", self._suffixes),
+        ), self._tz_offsets)
+
+    def _thaw(self):
+        """
+        Copy tables loaded by :py:meth:`from_binary` into ordinary memory so
+        they can be modified.
+        """
+
+        if isinstance(self._index, _LocaleIndex):
+            return
+        old_index = self._index
+        self._index = _LocaleIndex()
+        for name in ("_keywords", "_prefixes", "_suffixes"):
+            old = getattr(self, name)
+            new = _PackedTable(self._index, name == "_keywords")
+            for pattern in old:
+                new.store(pattern, [
+                    (key, self._index.localeset_id(old_index.localeset(set_id)))
+                    for key, set_id in old.entries(old.slot(pattern))
+                ])
+            setattr(self, name, new)
+
+    @classmethod
+    def _localized_conversion(cls, keywords, fmt, offset, d):
         for v, locales in d.items():
             for value, word in enumerate(v.split(";"), offset):
-                keywords[word.strip().casefold()][fmt, value].update(map(uniq, locales))
+                keywords[word.strip().casefold()][fmt, value].update(locales)
 
     _equivalents = {
         'e': 'd',
@@ -122,43 +397,167 @@ class TimeLocaleSet(object):
         :param era: Definitions of how years are counted and displayed.
         """
 
-        uniqlocales = _InternTable()
-        uniqlocalesets = _InternTable()
+        self._index = _LocaleIndex()
+        self._keywords = _PackedTable(self._index, True)
+        self._prefixes = _PackedTable(self._index, False)
+        self._suffixes = _PackedTable(self._index, False)
+        self._changes = OrderedDict()
+        self._generation = 0
 
-        keywords = defaultdict(lambda: defaultdict(set))
-        self._localized_conversion(uniqlocales, keywords, "a", 0, day or {})
-        self._localized_conversion(uniqlocales, keywords, "b", 1, mon or {})
-        self._localized_conversion(uniqlocales, keywords, "p", 0, am_pm or {})
-        self._localized_conversion(uniqlocales, keywords, "O", 0, alt_digits or {})
-
-        for fmt, merges in self._merge_patterns:
-            merged = set.union(*(keywords[pattern][fmt] for pattern in merges))
-            for pattern in merges:
-                keywords[pattern][fmt] = merged
+        keywords = self._keyword_delta(day, mon, am_pm, alt_digits)
 
+        tz_offsets = defaultdict(set)
         for timezone in pytz.all_timezones:
             tz = pytz.timezone(timezone)
             if hasattr(tz, "_transition_info"):
-                shortnames = set(tzname for _, _, tzname in tz._transition_info)
+                shortnames = set((tzname, utcoffset) for utcoffset, _, tzname in tz._transition_info)
             else:
-                shortnames = [tz._tzname]
-            for tzname in shortnames:
+                shortnames = [(tz._tzname, tz._utcoffset)]
+            for tzname, utcoffset in shortnames:
                 if tzname[0] not in "+-":
                     keywords[tzname.casefold()]["Z", tzname] = frozenset()
-
-        self._keywords = {
-            pattern: tuple(
-                (fmt, value, uniqlocalesets(tuple(sorted(locales))))
-                for (fmt, value), locales in fmts.items()
-            )
-            for pattern, fmts in keywords.items()
+                    # Local Mean Time is different in every zone that used
+                    # it, so it says nothing useful about the offset.
+                    if tzname != "LMT":
+                        tz_offsets[tzname.casefold()].add(utcoffset)
+        self._tz_offsets = {
+            tzname: tuple(sorted(offsets))
+            for tzname, offsets in tz_offsets.items()
         }
 
-        prefixes = defaultdict(lambda: defaultdict(set))
-        suffixes = defaultdict(lambda: defaultdict(set))
+        # "AM" and "PM" are recognized in every locale set, even ones with
+        # no am_pm examples of their own.
+        for fmt, merges in self._merge_patterns:
+            for pattern in merges:
+                keywords[pattern].setdefault(fmt, set())
+
+        self._merge(self._keywords, keywords)
+        self._merge_equivalent_keywords(keywords)
 
         # TODO: extract patterns from era
 
+        prefixes, suffixes = self._format_delta(formats)
+
+        for pattern, fmts in self._global_prefixes:
+            prefixes[pattern] = dict.fromkeys(((fmt,) for fmt in fmts), frozenset())
+
+        for pattern, fmts in self._global_suffixes:
+            suffixes[pattern] = dict.fromkeys(((fmt,) for fmt in fmts), frozenset())
+
+        self._merge(self._prefixes, prefixes)
+        self._merge(self._suffixes, suffixes)
+
+        # Nobody can have seen the tables before they were complete.
+        self._changes.clear()
+        self._generation = 0
+
+    def add_keywords(self, day=None, mon=None, am_pm=None, alt_digits=None):
+        """
+        Learn more names of weekdays, months, and so on, without rebuilding the
+        rest of this locale set. The parameters have the same meaning as for
+        the constructor. Any :py:class:`DateParser` using this locale set will
+        recognize the new keywords on its next parse.
+
+        >>> locale_set = TimeLocaleSet()
+        >>> 'agustus' in locale_set.keywords
+        False
+        >>> locale_set.add_keywords(mon={
+        ...     "Januari;Februari;Maret;April;Mei;Juni;Juli;Agustus;September;Oktober;November;Desember": ["id_ID"],
+        ... })
+        >>> locale_set.keywords['agustus']
+        (('b', 8, ('id_ID',)),)
+        """
+
+        self._thaw()
+        keywords = self._keyword_delta(day, mon, am_pm, alt_digits)
+        self._merge(self._keywords, keywords)
+        self._merge_equivalent_keywords(keywords)
+
+    def add_formats(self, formats):
+        """
+        Learn prefix and suffix patterns from more sample format strings,
+        without rebuilding the rest of this locale set. The parameter has the
+        same meaning as for the constructor. Any :py:class:`DateParser` using
+        this locale set will use the new patterns on its next parse.
+
+        >>> locale_set = TimeLocaleSet()
+        >>> locale_set.add_formats({'%Y년 %m월 %d일': ['ko_KR']})
+        >>> locale_set.suffixes['년']
+        (('y', ('ko_KR',)),)
+        """
+
+        self._thaw()
+        prefixes, suffixes = self._format_delta(formats)
+
+        # Patterns that are allowed in all locales stay that way.
+        for pattern, _ in self._global_prefixes:
+            prefixes.pop(pattern, None)
+        for pattern, _ in self._global_suffixes:
+            suffixes.pop(pattern, None)
+
+        self._merge(self._prefixes, prefixes)
+        self._merge(self._suffixes, suffixes)
+
+    def update(self, formats=None, day=None, mon=None, am_pm=None, alt_digits=None, era=None):
+        """
+        Learn from more examples, accepting the same parameters as the
+        constructor. This is equivalent to calling :py:meth:`add_formats` and
+        :py:meth:`add_keywords`, and costs time proportional to the size of
+        the examples rather than the size of this locale set.
+        """
+
+        self.add_keywords(day=day, mon=mon, am_pm=am_pm, alt_digits=alt_digits)
+        self.add_formats(formats or {})
+
+    @property
+    def generation(self):
+        """
+        A counter which increases whenever this locale set learns something
+        new. Compare it between calls to :py:meth:`changed_since` to find out
+        what changed.
+        """
+        return self._generation
+
+    def changed_since(self, generation):
+        """
+        :param int generation: a previous value of :py:attr:`generation`
+        :return: the keyword, prefix, and suffix patterns which have been added
+            or modified since then
+        """
+
+        # The log keeps only the latest change to each pattern, so it never
+        # grows larger than the tables, and the most recent are at the end.
+        changed = []
+        for pattern, changed_at in reversed(self._changes.copy().items()):
+            if changed_at <= generation:
+                break
+            changed.append(pattern)
+        return changed
+
+    def _keyword_delta(self, day, mon, am_pm, alt_digits):
+        keywords = defaultdict(lambda: defaultdict(set))
+        self._localized_conversion(keywords, "a", 0, day or {})
+        self._localized_conversion(keywords, "b", 1, mon or {})
+        self._localized_conversion(keywords, "p", 0, am_pm or {})
+        self._localized_conversion(keywords, "O", 0, alt_digits or {})
+        return keywords
+
+    def _merge_equivalent_keywords(self, delta):
+        for fmt, merges in self._merge_patterns:
+            if not any(fmt in delta.get(pattern, ()) for pattern in merges):
+                continue
+            merged = set()
+            for pattern in merges:
+                merged.update(self._locales_for(self._keywords, pattern, fmt))
+            self._merge(self._keywords, {
+                pattern: { fmt: merged }
+                for pattern in merges
+            })
+
+    def _format_delta(self, formats):
+        prefixes = defaultdict(lambda: defaultdict(set))
+        suffixes = defaultdict(lambda: defaultdict(set))
+
         for v, locales in (formats or {}).items():
             tokens = iter(self._fmt_token.split(v))
             prefix = next(tokens)
@@ -168,34 +567,73 @@ class TimeLocaleSet(object):
                 if fmt.lower() not in "abp":
                     fmt = self._equivalents.get(fmt, fmt)
                     if prefix != '':
-                        prefixes[prefix.casefold()][fmt].update(map(uniqlocales, locales))
+                        prefixes[prefix.casefold()][fmt,].update(locales)
                     if suffix != '':
-                        suffixes[suffix.casefold()][fmt].update(map(uniqlocales, locales))
+                        suffixes[suffix.casefold()][fmt,].update(locales)
 
                 # This conversion's suffix is the next conversion's prefix.
                 prefix = suffix
 
-        for pattern, fmts in self._global_prefixes:
-            prefixes[pattern] = dict.fromkeys(fmts, frozenset())
+        return prefixes, suffixes
 
-        for pattern, fmts in self._global_suffixes:
-            suffixes[pattern] = dict.fromkeys(fmts, frozenset())
-
-        self._prefixes = {
-            pattern: tuple(
-                (fmt, uniqlocalesets(tuple(sorted(locales))))
-                for fmt, locales in fmts.items()
-            )
-            for pattern, fmts in prefixes.items()
-        }
+    def _locales_for(self, table, pattern, key):
+        slot = table.slot(pattern)
+        if slot is not None:
+            for entry_key, set_id in table.entries(slot):
+                if entry_key == key:
+                    return self._index.localeset(set_id)
+        return ()
 
-        self._suffixes = {
-            pattern: tuple(
-                (fmt, uniqlocalesets(tuple(sorted(locales))))
-                for fmt, locales in fmts.items()
-            )
-            for pattern, fmts in suffixes.items()
-        }
+    def _merge(self, table, delta):
+        """
+        Add the locales in `delta`, which maps patterns to dictionaries from
+        entry keys to sets of locales, to the corresponding entries of
+        `table`. Only the patterns mentioned in `delta` are touched.
+        """
+
+        index = self._index
+        for pattern, fmts in delta.items():
+            merged = fmts
+            slot = table.slot(pattern)
+            if slot is not None:
+                merged = {}
+                for key, set_id in table.entries(slot):
+                    merged[key] = set(index.localeset(set_id))
+                for key, locales in fmts.items():
+                    merged.setdefault(key, set()).update(locales)
+            table.store(pattern, [
+                (key, index.localeset_id(locales))
+                for key, locales in merged.items()
+            ])
+            # Log the change before publishing the new generation, so that
+            # anyone who sees the generation can find out what changed.
+            generation = self._generation + 1
+            self._changes[pattern] = generation
+            self._changes.move_to_end(pattern)
+            self._generation = generation
+
+    def memory_report(self):
+        """
+        Estimate how many bytes each of this locale set's tables occupies.
+        Shared storage for locale names, sets of locale names, and keyword
+        values such as timezone abbreviations is reported separately from the
+        tables that refer to it.
+
+        >>> sorted(TimeLocaleSet().memory_report())
+        ['keywords', 'locales', 'localesets', 'prefixes', 'strings', 'suffixes', 'tz_offsets']
+
+        :rtype: dict(str, int)
+        """
+
+        report = self._index.memory_report()
+        report["keywords"] = self._keywords.memory_report()
+        report["prefixes"] = self._prefixes.memory_report()
+        report["suffixes"] = self._suffixes.memory_report()
+        if isinstance(self._tz_offsets, dict):
+            report["tz_offsets"] = _sizeof(self._tz_offsets)
+        else:
+            report["tz_offsets"] = self._tz_offsets.memory_report()
+        return report
 
     @property
     def keywords(self):
@@ -310,8 +748,153 @@ class TimeLocaleSet(object):
         """
         return self._suffixes
 
+    @property
+    def tz_offsets(self):
+        """
+        Map each timezone abbreviation that ``%Z`` can produce, in lower
+        case, to the UTC offsets it has stood for, in increasing order. These
+        come from the same timezone database as the ``%Z`` entries in
+        :py:attr:`keywords`, so looking up an abbreviation found while
+        parsing is a single dictionary lookup.
+
+        >>> tz_offsets = TimeLocaleSet().tz_offsets
+        >>> tz_offsets['awst']
+        (datetime.timedelta(seconds=28800),)
+
+        Some abbreviations have been used for several offsets. For example,
+        "PST" is Pacific Standard Time in North America, but also Philippine
+        Standard Time.
+
+        >>> [offset.total_seconds() / 3600 for offset in tz_offsets['pst']]
+        [-8.0, 8.0]
+
+        "LMT", for Local Mean Time, is recognized as a ``%Z`` keyword but has
+        no entry here, because it was different in every place that used it.
+
+        >>> 'lmt' in tz_offsets
+        False
+        """
+        return self._tz_offsets
+
+def _locale_count(locale_sets):
+    return len(set().union(*(locales or () for locales in locale_sets)))
+
+def _keyword_fanout(parser, pattern):
+    """
+    Summarize how much `parser`'s search branches on one keyword, as a row of
+    the ``--fanout`` report. Alternate digits can give several conversions for
+    each entry in the keyword table, all used in the same locales:
+
+    >>> from percentagent import DateParser
+    >>> locale_set = TimeLocaleSet(
+    ...     day={"日;一;二;三;四;五;六": ["zh_CN"]},
+    ...     alt_digits={"〇;一;二;三;四;五;六;七": ["ja_JP", "lzh_TW"]},
+    ... )
+    >>> _keyword_fanout(DateParser(locale_set), "一")
+    (8, 3, '一', '%OC %OH %OM %OS %Od %Om %Oy %a')
+
+    :return: how many conversions the parser considers for `pattern`, how
+        many locales use any of them, the pattern, and the conversion
+        specifiers
+    """
+
+    is_number, choices = parser._tokens.get(pattern) or parser._analyze(pattern)
+    return (
+        len(choices),
+        _locale_count(choice[3] for choice in choices),
+        pattern,
+        " ".join(sorted(set(choice[1] for choice in choices))),
+    )
+
 if __name__ == "__main__":
-    locale_set = TimeLocaleSet.default()
+    import argparse
+
+    argparser = argparse.ArgumentParser(description="Dump locale tables.")
+    argparser.add_argument("--provider", default="glibc")
+    argparser.add_argument("--write-binary", metavar="PATH", help="save the tables for TimeLocaleSet.from_binary instead of dumping them")
+    argparser.add_argument("--fanout", action="store_true", help="instead of dumping the tables, rank their entries by how ambiguous they are")
+    argparser.add_argument("--corpus", metavar="PATH", type=argparse.FileType("r", encoding="utf-8"), help="with --fanout, also estimate each token's share of the search cost of parsing each line of this file")
+    argparser.add_argument("--top", type=int, default=20, help="with --fanout, how many entries to list in each ranking")
+    args = argparser.parse_args()
+
+    locale_set = TimeLocaleSet.default(args.provider)
+
+    if args.write_binary:
+        with open(args.write_binary, "wb") as f:
+            locale_set.write_binary(f)
+        raise SystemExit
+
+    if args.fanout:
+        from collections import Counter
+        from percentagent import DateParser
+
+        parser = DateParser(locale_set)
+
+        def rank(title, rows):
+            print(title)
+            print("{:>6} {:>7}  {}".format("fanout", "locales", "pattern"))
+            rows = sorted(rows, key=lambda row: (-row[0], -row[1], row[2]))
+            for fanout, locales, pattern, detail in rows[:args.top]:
+                print("{:6} {:7}  {!r}: {}".format(fanout, locales, pattern, detail))
+            print()
+
+        # Rank keywords by the conversions the parser actually considers for
+        # them, which for alternate digits can be several per table entry.
+        rank("keywords:", (_keyword_fanout(parser, pattern) for pattern in locale_set.keywords))
+        for title, table in (("prefixes:", locale_set.prefixes), ("suffixes:", locale_set.suffixes)):
+            rank(title, (
+                (len(fmts), _locale_count(locales for fmt, locales in fmts), pattern, " ".join(sorted("%" + fmt for fmt, locales in fmts)))
+                for pattern, fmts in table.items()
+            ))
+
+        if args.corpus is None:
+            raise SystemExit
+
+        # A token with n possible conversions multiplies the search by up to
+        # n, so split each line's search states among its tokens in
+        # proportion to the extra choices each one adds.
+        occurrences = Counter()
+        cost = Counter()
+        hint_occurrences = Counter()
+        total = Counter()
+        lines = 0
+        with args.corpus:
+            for line in args.corpus:
+                line = line.strip()
+                if not line:
+                    continue
+                lines += 1
+                stats = Counter()
+                parser.parse(line, stats=stats)
+                total.update(stats)
+
+                tokens = [token.casefold() for token in parser._tokenizer.split(parser._whitespace.sub(" ", line))[1::2]]
+                extra = {}
+                for idx, token in enumerate(tokens):
+                    is_number, choices = parser._tokens.get(token) or parser._analyze(token)
+                    if choices:
+                        occurrences[token] += 1
+                        extra[token] = extra.get(token, 0) + len(choices) - 1
+                    if idx + 1 < len(tokens) and token in locale_set.prefixes:
+                        hint_occurrences["prefix", token] += 1
+                    if idx > 0 and token in locale_set.suffixes:
+                        hint_occurrences["suffix", token] += 1
+                weight = sum(extra.values())
+                for token, n in extra.items():
+                    if n:
+                        cost[token] += stats["generated"] * n / weight
+
+        print("{} lines, {:.1f} search states generated per line".format(lines, total["generated"] / max(lines, 1)))
+        print()
+        print("estimated share of search states generated:")
+        print("{:>6} {:>7}  {}".format("share", "uses", "token"))
+        for token, states in cost.most_common(args.top):
+            print("{:6.1%} {:7}  {!r}".format(states / max(total["generated"], 1), occurrences[token], token))
+        print()
+        print("most used prefixes and suffixes:")
+        for (kind, token), count in hint_occurrences.most_common(args.top):
+            print("{:7} {}  {!r}".format(count, kind, token))
+        raise SystemExit
 
     for pattern, fmts in sorted(locale_set.keywords.items()):
         print("{!r}:".format(pattern))
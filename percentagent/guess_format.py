@@ -2,10 +2,17 @@
 
 from collections import Counter, OrderedDict, namedtuple
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+import heapq
 import itertools
+import os
 import re
+import sys
+import threading
+import time
 
 from percentagent.extract_patterns import TimeLocaleSet
+from percentagent.slowlog import SlowParse
 
 _Assignment = namedtuple("_Assignment", (
     "pos",
@@ -28,21 +35,196 @@ class DateParser(object):
     This class precomputes some large data structures when constructed, so you
     should reuse the same instance for multiple parses, if possible.
 
-    Instances of this class may safely be used from multiple threads.
+    Instances of this class may safely be used from multiple threads; see
+    :py:meth:`parse_many` for a thread pool that does that for you.
+
+    Either of two search strategies finds the same results, in the same
+    order. ``"depth-first"`` uses the least memory, while ``"best-first"``
+    never explores a state that can't lead to one of the best results, at
+    the cost of keeping a priority queue of states to explore.
+
+    >>> from collections import Counter
+    >>> stats = Counter()
+    >>> DateParser(TimeLocaleSet(), strategy="best-first").parse("2018/01/09", stats=stats)
+    [('%Y/%m/%d', datetime.date(2018, 1, 9), None), ('%Y/%d/%m', datetime.date(2018, 9, 1), None)]
+    >>> stats["expanded"] > 0
+    True
+
+    Timestamps in well-known formats, like ISO 8601 or RFC 2822, can usually
+    skip the search, reusing what was learned from earlier timestamps with
+    the same keywords and separators, whatever their numbers. The parser
+    learns less when it's rarely reusing anything, and you can turn it off.
+    Results are the same either way.
+
+    >>> stats = Counter()
+    >>> DateParser(TimeLocaleSet()).parse("2018-01-09", stats=stats)
+    [('%Y-%m-%d', datetime.date(2018, 1, 9), None), ('%Y-%d-%m', datetime.date(2018, 9, 1), None)]
+    >>> stats["recognized"], stats["expanded"]
+    (1, 0)
+    >>> stats = Counter()
+    >>> DateParser(TimeLocaleSet(), fast_lane=False).parse("2018-01-09", stats=stats)
+    [('%Y-%m-%d', datetime.date(2018, 1, 9), None), ('%Y-%d-%m', datetime.date(2018, 9, 1), None)]
+    >>> stats["recognized"], stats["expanded"] > 0
+    (0, True)
 
     :param TimeLocaleSet locale_set: locales to consider when parsing timestamps
+    :param str strategy: how to search for the best explanations of a
+        timestamp; one of :py:attr:`strategies`
+    :param planner: an :py:class:`~percentagent.planner.AdaptivePlanner` to
+        choose the order :py:meth:`parse` searches in, learning from each
+        parse; by default, a fixed rule picks the order
+    :param slow_log: a :py:class:`~percentagent.slowlog.SlowLog` to record
+        calls to :py:meth:`parse` which take longer than its threshold
+    :param bool fast_lane: whether to skip the search for timestamps in
+        well-known formats, when it can
     """
 
     _whitespace = re.compile(r'\s+')
 
-    def __init__(self, locale_set=None):
+    strategies = ("depth-first", "best-first")
+
+    def __init__(self, locale_set=None, strategy="depth-first", planner=None, slow_log=None, fast_lane=True):
         if locale_set is None:
             locale_set = TimeLocaleSet.default()
+        if strategy not in self.strategies:
+            raise ValueError("unknown search strategy {!r}; expected one of {}".format(strategy, ", ".join(self.strategies)))
         self.locale_set = locale_set
+        self.strategy = strategy
+        self.planner = planner
+        self.slow_log = slow_log
+        self.fast_lane = fast_lane
+        self._search = self._best_first if strategy == "best-first" else self._depth_first
+        self._generation = locale_set.generation
+        self._sync_lock = threading.Lock()
         strings = set(itertools.chain(locale_set.prefixes, locale_set.keywords, locale_set.suffixes))
-        self.compiled = re.compile(r'(\d{1,2}|[+-]\d{4}|' + '|'.join(map(re.escape, sorted(strings, reverse=True))) + ')', re.I)
+        self._tokenizer = _Tokenizer(strings)
+
+        # Everything about a token that doesn't depend on its neighbors is
+        # worked out once: here for every number that can appear in a date,
+        # and for each keyword, prefix, or suffix the first time it's seen.
+        # Doing every keyword up front would cost more time and memory than
+        # a parser typically saves with them. What each prefix or suffix
+        # hints at is cheap enough to work out here.
+        self._localesets = {}
+        self._tokens = {
+            token: self._analyze(token)
+            for token in self._numbers
+        }
+        self._prefix_hints = {
+            pattern: self._hints(locale_set.prefixes, pattern, True)
+            for pattern in locale_set.prefixes
+        }
+        self._suffix_hints = {
+            pattern: self._hints(locale_set.suffixes, pattern, False)
+            for pattern in locale_set.suffixes
+        }
+
+        # Where the tokens are in each shape of input that _well_known
+        # recognizes, the templates for those inputs, and the description of
+        # each token seen in them; with how many entries the shapes and
+        # templates hold, how many inputs they've answered without learning
+        # anything, and how many times they've had to learn something new.
+        self._shapes = {}
+        self._templates = {}
+        self._described = {}
+        self._fast_lane_lock = threading.Lock()
+        self._fast_lane_size = 0
+        self._fast_lane_hits = 0
+        self._fast_lane_learned = 0
+        self._guarded_digits = self._digit_guards(strings)
+
+        # Where the tokens with digits are in each shape, and each such
+        # token's kind, for shape.
+        self._shape_bounds = {}
+        self._token_kinds = {}
+        self._kind_copies = {}
+
+    _numbers = tuple(str(value) for value in range(10)) + tuple("{:02}".format(value) for value in range(100))
+
+    def _sync(self):
+        """
+        Catch up with keywords, prefixes, and suffixes that were added to the
+        locale set after this parser was constructed.
+        """
+
+        with self._sync_lock:
+            generation = self.locale_set.generation
+            if generation == self._generation:
+                # Another thread caught up while we waited for the lock.
+                return
+            changed = self.locale_set.changed_since(self._generation)
+            self._tokenizer = self._tokenizer.extend(changed)
+
+            # Other threads may be parsing with the current tables, so
+            # replace them rather than modifying them in place.
+            tokens = dict(self._tokens)
+            prefix_hints = dict(self._prefix_hints)
+            suffix_hints = dict(self._suffix_hints)
+            for pattern in changed:
+                if pattern not in self._numbers:
+                    tokens.pop(pattern, None)
+                else:
+                    tokens[pattern] = self._analyze(pattern)
+                if pattern in self.locale_set.prefixes:
+                    prefix_hints[pattern] = self._hints(self.locale_set.prefixes, pattern, True)
+                if pattern in self.locale_set.suffixes:
+                    suffix_hints[pattern] = self._hints(self.locale_set.suffixes, pattern, False)
+            self._tokens = tokens
+            self._prefix_hints = prefix_hints
+            self._suffix_hints = suffix_hints
+            self._guarded_digits = self._digit_guards(self._tokenizer.strings | self._tokenizer.extra)
+            with self._fast_lane_lock:
+                self._shapes = {}
+                self._templates = {}
+                self._described = {}
+                self._fast_lane_size = 0
+            self._shape_bounds = {}
+            self._token_kinds = {}
+            self._kind_copies = {}
+
+            self._generation = generation
+
+    def _analyze(self, token):
+        """
+        :return: whether `token` is a number, and each conversion it could be
+            as a tuple of the category it fills, the conversion specifier,
+            its value, the locales that use it, and the category of prefix or
+            suffix hints which apply to it
+        """
+
+        return token.isdigit(), self._choices(self._lookup_keyword(token))
+
+    @staticmethod
+    def _choices(conversions):
+        """
+        :return: the choices for a token, as :py:meth:`_analyze` describes
+            them, given the conversion specifier, value, and locales of each
+        """
+
+        choices = []
+        for fmt, value, locales in conversions:
+            category = fmt[-1]
+            if category == "b":
+                # Month-names should be treated like numeric months.
+                category = "m"
+            elif category == "z":
+                category = "Z"
+            choices.append((category, fmt, value, locales, fmt[-1]))
+        return tuple(choices)
+
+    @staticmethod
+    def _hints(table, pattern, prefix):
+        """
+        :return: a dictionary mapping conversion specifier characters to the
+            locales in which `pattern` precedes or follows them
+        """
 
-    def parse(self, s):
+        hints = dict(table.get(pattern, ()))
+        if prefix and "y" in hints:
+            hints["C"] = tuple(set(hints["y"] + hints.get("C", ())))
+        return hints
+
+    def parse(self, s, lazy=False, stats=None):
         """
         Infer format strings for a single timestamp.
 
@@ -72,6 +254,11 @@ class DateParser(object):
         >>> parser.parse("21:04:56")
         [('%H:%M:%S', datetime.time(21, 4, 56), None)]
 
+        "AM" and "PM" are recognized even without any locale data:
+
+        >>> parser.parse("4:45 AM")
+        [('%H:%M %p', datetime.time(4, 45), None)]
+
         Using locale-specific strings can help avoid ambiguity too:
 
         >>> parser = DateParser(TimeLocaleSet(
@@ -80,53 +267,667 @@ class DateParser(object):
         >>> parser.parse("2018Jan9")
         [('%Y%b%d', datetime.date(2018, 1, 9), frozenset({'en_US'}))]
 
+        Most callers only look at some of each result, so with `lazy` set,
+        the format string, value, and locales of each result are only worked
+        out when first used. Lazy results still unpack like tuples:
+
+        >>> [result] = parser.parse("2018Jan9", lazy=True)
+        >>> result.format
+        '%Y%b%d'
+        >>> fmt, value, locales = result
+        >>> value
+        datetime.date(2018, 1, 9)
+
+        A timezone abbreviation which has only ever meant one UTC offset gives
+        an aware value, but some, like "PST", have stood for several. Those
+        values are left naive, and the tuples have no room for the candidate
+        offsets, so only lazy results report them, in
+        :py:attr:`ParseResult.offsets`:
+
+        >>> parser.parse("2018-01-13 12:00 PST")
+        [('%Y-%m-%d %H:%M %Z', datetime.datetime(2018, 1, 13, 12, 0), None)]
+        >>> [result] = parser.parse("2018-01-13 12:00 PST", lazy=True)
+        >>> [offset.total_seconds() / 3600 for offset in result.offsets]
+        [-8.0, 8.0]
+
+        The "Z" that ends many ISO 8601 timestamps means UTC. It's a literal
+        in the format string, but the value is aware:
+
+        >>> parser.parse("2018-01-13T12:00:00Z")
+        [('%Y-%m-%dT%H:%M:%SZ', datetime.datetime(2018, 1, 13, 12, 0, tzinfo=datetime.timezone.utc), None)]
+
         :param str s: text which contains a date and/or time
-        :return: possible format strings, and corresponding locales
-        :rtype: list(tuple(str, set(str) or None))
+        :param bool lazy: return :py:class:`ParseResult` objects instead of
+            tuples
+        :param collections.Counter stats: if provided, add the number of
+            search states ``"expanded"`` and ``"generated"`` during this
+            parse to it, along with the number of ``"tokens"`` and how many
+            of those weren't in the token table yet and had to be
+            ``"analyzed"``; or if the input has a well-known format that
+            needed no search, count it as ``"recognized"``
+        :return: possible format strings, values, and corresponding locales
+        :rtype: list(tuple(str, datetime.date or datetime.time or
+            datetime.datetime, frozenset(str) or None))
+        """
+
+        if self.slow_log is not None:
+            return self._logged_parse(s, lazy, stats)
+        return self._parse(s, lazy, stats)
+
+    def _parse(self, s, lazy, stats):
+        recognized = self._recognize(s)
+        if recognized is not None:
+            if stats is not None:
+                stats["recognized"] += 1
+            literals, raw, leaves = recognized
+            return [self._result(state, century, raw, literals, lazy) for state, century in leaves]
+
+        plan = self._plan(s, stats)
+        if plan is None:
+            return []
+        literals, raw, root, numeric = plan
+        if self.planner is None:
+            leaves = self._search(root, numeric, stats)
+        else:
+            leaves = self._adaptive_search(root, numeric, stats)
+        return [self._result(state, century, raw, literals, lazy) for state, century in leaves]
+
+    def _logged_parse(self, s, lazy, stats):
+        """
+        Parse `s`, and if that takes too long, tell the slow log about it.
+        Everything the log wants to know beyond the time and the number of
+        states is worked out only after the parse turns out to be slow.
+        """
+
+        log = self.slow_log
+        counts = Counter()
+        start = time.perf_counter()
+        results = self._parse(s, lazy, counts)
+        elapsed = time.perf_counter() - start
+        if stats is not None:
+            stats.update(counts)
+        if elapsed > log.threshold:
+            log.add(self._slow_record(s, elapsed, len(results), counts, log.trace))
+        return results
+
+    def _slow_record(self, s, elapsed, results, counts, trace):
+        segments = tuple(self._tokenizer.split(self._whitespace.sub(" ", s)))
+        groups = ()
+        steps = None
+        plan = self._plan(s)
+        if plan is not None:
+            literals, raw, root, numeric = plan
+            groups = tuple((category, len(options)) for category, options, position, value, positions in root.remaining_groups)
+            if trace:
+                steps = []
+                # Run the search to the end, even if it's a generator.
+                for leaf in self._search(root, numeric, None, trace=steps):
+                    pass
+                steps = tuple(steps[:trace])
+        return SlowParse(
+            input=s,
+            elapsed=elapsed,
+            results=results,
+            segments=segments,
+            groups=groups,
+            expanded=counts["expanded"],
+            generated=counts["generated"],
+            recognized=bool(counts["recognized"]),
+            trace=steps,
+        )
+
+    def iparse(self, s, lazy=False, stats=None):
+        """
+        Like :py:meth:`parse`, but produce each result as soon as the search
+        has proven that it's one of the best, rather than waiting for the
+        search to finish. The results and their order are the same.
+
+        If you stop iterating early, the rest of the search is skipped.
+        Call ``close()`` on the iterator to release it promptly.
+
+        >>> parser = DateParser(TimeLocaleSet())
+        >>> results = parser.iparse("2018-01-09")
+        >>> next(results)
+        ('%Y-%m-%d', datetime.date(2018, 1, 9), None)
+        >>> results.close()
+
+        This always uses the ``"best-first"`` strategy, whichever one the
+        parser was constructed with, because that's the strategy which can
+        tell when a result is one of the best. For the same reason it always
+        searches in the default order, ignoring any planner.
+
+        :param str s: text which contains a date and/or time
+        :param bool lazy: produce :py:class:`ParseResult` objects instead of
+            tuples
+        :param collections.Counter stats: as for :py:meth:`parse`; search
+            states are counted when the iterator finishes or is closed
+        :rtype: iterator(tuple(str, datetime.date or datetime.time or
+            datetime.datetime, frozenset(str) or None))
+        """
+
+        recognized = self._recognize(s)
+        if recognized is not None:
+            if stats is not None:
+                stats["recognized"] += 1
+            literals, raw, leaves = recognized
+            for state, century in leaves:
+                yield self._result(state, century, raw, literals, lazy)
+            return
+
+        plan = self._plan(s, stats)
+        if plan is None:
+            return
+        literals, raw, root, numeric = plan
+        search = self._best_first(root, numeric, stats)
+        try:
+            for state, century in search:
+                yield self._result(state, century, raw, literals, lazy)
+        finally:
+            search.close()
+
+    def parse_many(self, strings, lazy=False, stats=None, threads=None):
+        """
+        Like :py:meth:`parse`, for each of several timestamps, optionally
+        spreading the work across a pool of threads.
+
+        >>> parser = DateParser(TimeLocaleSet())
+        >>> parser.parse_many(["2018-05-13", "21:04:56"], threads=2)
+        [[('%Y-%m-%d', datetime.date(2018, 5, 13), None)], [('%H:%M:%S', datetime.time(21, 4, 56), None)]]
+
+        Parsing is pure Python, so on an interpreter with a global
+        interpreter lock, threads only add overhead. Without the lock they
+        can run in parallel, but how well that scales hasn't been measured;
+        running this module as a script reports it for the interpreter
+        you run it with.
+
+        :param strings: iterable of texts which contain dates and/or times
+        :param bool lazy: as for :py:meth:`parse`
+        :param collections.Counter stats: as for :py:meth:`parse`; counts for
+            all the strings are added to it
+        :param int threads: how many threads to parse with; defaults to the
+            number of CPUs if the interpreter has no global interpreter lock,
+            and 1 otherwise, which parses in the calling thread
+        :return: the results of :py:meth:`parse` for each string, in order
+        :rtype: list(list)
+        """
+
+        strings = list(strings)
+        if threads is None:
+            threads = 1
+            if not getattr(sys, "_is_gil_enabled", lambda: True)():
+                threads = os.cpu_count() or 1
+
+        if threads == 1 or len(strings) <= 1:
+            return [self.parse(s, lazy, stats) for s in strings]
+
+        # Hand out a few chunks per thread, so one slow chunk doesn't leave
+        # the other threads idle for long, without paying for a task per
+        # string. Each chunk counts into its own Counter, since updating a
+        # shared one from several threads at once could lose counts.
+        size = -(-len(strings) // (threads * 4))
+        chunks = [strings[start:start + size] for start in range(0, len(strings), size)]
+
+        def parse_chunk(chunk):
+            chunk_stats = None if stats is None else Counter()
+            return [self.parse(s, lazy, chunk_stats) for s in chunk], chunk_stats
+
+        results = []
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for chunk_results, chunk_stats in pool.map(parse_chunk, chunks):
+                results.extend(chunk_results)
+                if stats is not None:
+                    stats.update(chunk_stats)
+        return results
+
+    def session(self, size=64):
+        """
+        Start a :py:class:`ParseSession` for parsing one input after each
+        edit, such as in a text field that shows results as you type.
+
+        :param int size: how many recent inputs the session remembers the
+            results for
+        """
+
+        return ParseSession(self, size)
+
+    def shape(self, s):
+        """
+        Describe `s` in a way that's the same for any other string this
+        parser would treat alike, except for which values are valid.
+
+        The description is `s` with every digit replaced by 0, along with
+        the conversions each token with digits in it could fill. Two
+        strings with the same shape are split into the same tokens, and the
+        same choices are open for each, so they can only differ in which
+        formats explain them if some of their values are invalid, like
+        February 30th.
+
+        >>> parser = DateParser(TimeLocaleSet())
+        >>> parser.shape("2018-01-09")[0]
+        '0000-00-00'
+        >>> parser.shape("2018-01-09") == parser.shape("2019-02-03")
+        True
+        >>> parser.shape("2018-01-09") == parser.shape("2018-01-13")
+        False
+
+        :param str s: text which may contain a date and/or time
+        :return: the text of the shape, and a tuple with a hashable kind for
+            each token with digits in it
+        :rtype: tuple(str, tuple)
+        """
+
+        if self._generation != self.locale_set.generation:
+            self._sync()
+
+        s = self._whitespace.sub(" ", s)
+        text = self._shape(s)
+        bounds = self._shape_bounds.get(text)
+        if bounds is None:
+            if len(self._shape_bounds) >= self._max_shape_cache:
+                self._shape_bounds = {}
+            bounds = []
+            pos = 0
+            for idx, segment in enumerate(self._tokenizer.split(s)):
+                if idx % 2 and any(char in "0123456789" for char in segment):
+                    bounds.append((pos, pos + len(segment)))
+                pos += len(segment)
+            self._shape_bounds[text] = bounds = tuple(bounds)
+
+        kinds = self._token_kinds
+        found = tuple([kinds.get(s[start:end].casefold()) for start, end in bounds])
+        if None in found:
+            found = tuple([self._token_kind(s[start:end].casefold()) for start, end in bounds])
+        return text, found
+
+    # Bound on the memory used by the caches for shape.
+    _max_shape_cache = 65536
+
+    def _token_kind(self, token):
+        kind = self._token_kinds.get(token)
+        if kind is None:
+            if len(self._token_kinds) >= self._max_shape_cache:
+                self._token_kinds = {}
+                self._kind_copies = {}
+            if token in self._prefix_hints or token in self._suffix_hints:
+                # Which hints a token gives depends on the whole token.
+                kind = token
+            else:
+                analysis = self._tokens.get(token)
+                if analysis is None:
+                    analysis = self._analyze(token)
+                # A frozenset remembers its hash, which saves callers
+                # that look shapes up in a dictionary from hashing every
+                # choice every time.
+                kind = frozenset(_choice_kinds(analysis[1]))
+            # Many tokens share a kind; keep only one copy of each.
+            kind = self._kind_copies.setdefault(kind, kind)
+            self._token_kinds[token] = kind
+        return kind
+
+    def _result(self, state, century, raw, literals, lazy):
+        tz_offsets = self.locale_set.tz_offsets
+        if lazy:
+            return ParseResult(state, century, raw, literals, tz_offsets)
+        return (state.pattern(raw, literals), state.convert(century, state.offsets(tz_offsets, literals)), state.locales())
+
+    @staticmethod
+    def _digit_guards(strings):
+        """
+        Most digits can be changed without changing how an input is split
+        into tokens, but not digits that could be part of a keyword, like
+        "lw5". Find the characters that come right before a run of digits in
+        some keyword, and how long the longest such run is.
+
+        :return: an expression matching digits after any of those
+            characters, and the longest run after each one; or
+            :py:obj:`None` if no keyword has digits in it
+        """
+
+        guards = {}
+        for pattern in strings:
+            for match in re.finditer(r'(?<=[^0-9])[0-9]+', pattern):
+                prev = pattern[match.start() - 1]
+                guards[prev] = max(guards.get(prev, 0), len(match.group()))
+        if not guards:
+            return None
+        return re.compile("[" + re.escape("".join(sorted(guards))) + "][0-9]+", re.I), guards
+
+    def _recognize(self, s):
+        """
+        Fast lane for timestamps in well-known formats like ISO 8601, which
+        skips the search whenever it can prove the result would be the same.
+
+        Inputs with the same *shape*, meaning the same text except for the
+        values of their digits, are split into tokens at the same places,
+        so the first input of each shape records where its tokens are.
+
+        The search never looks at a token's text, only at the choices of
+        conversion it has; and only the value constraints and the final
+        validity check look at the values of those choices. So each token
+        is described by the kinds of choice it has, leaving out the values,
+        as for :py:meth:`shape`; except that a number which isn't a keyword
+        is described only by whether it's over 99, so that, say, "09" and
+        "31" are alike even though only one of them could be a month. A
+        *template* is learned for each sequence of descriptions, by
+        searching as if every token had every kind of choice its
+        description allows and every value constraint held, which records
+        the complete states that would be best. For each input, the results
+        are those states which only use choices its tokens actually have,
+        and which are valid with its values. With fewer choices, nothing
+        can score better than those states, and the search would find
+        anything that scores as well among them. If none remain, the best
+        results score lower, so the next level of scores is learned too, up
+        to a limit. Ties are put in the order the search would find them
+        in for this input.
+
+        Learning a template costs about as much as the search it's meant to
+        skip, but each one covers every date and time with the same keywords
+        and separators. See :py:meth:`_may_learn` for how it limits the time
+        and memory spent on inputs that don't repeat even that much.
+
+        :return: the literal text between tokens, the tokens themselves, and
+            each result's state and century; or :py:obj:`None` to fall back
+            to the full search
+        """
+
+        if not self.fast_lane:
+            return None
+
+        if self._generation != self.locale_set.generation:
+            self._sync()
+
+        s = self._whitespace.sub(" ", s)
+        if _well_known.fullmatch(s) is None:
+            return None
+
+        shape = self._shape(s)
+        learned = False
+        bounds = self._shapes.get(shape)
+        if bounds is None:
+            if not self._may_learn():
+                return None
+            bounds = [0]
+            for segment in self._tokenizer.split(s):
+                bounds.append(bounds[-1] + len(segment))
+            bounds = self._shapes.setdefault(shape, tuple(bounds))
+
+        segments = [s[start:end] for start, end in zip(bounds, bounds[1:])]
+        raw = segments[1::2]
+        described = self._described
+        descriptions = []
+        for token in raw:
+            description = described.get(token)
+            if description is None:
+                description = self._describe(token)
+                if len(described) < self._max_described:
+                    described[token] = description
+            descriptions.append(description)
+        key = tuple([description for description, values in descriptions])
+
+        levels = self._templates.get(key, ())
+
+        for level in itertools.count():
+            if level == len(levels):
+                if level >= self._max_levels:
+                    return None
+                if not self._may_learn():
+                    return None
+                learned = True
+                below = levels[-1][0] if levels else None
+                new_level = self._template_level(s, segments, descriptions, below)
+                levels += (new_level,)
+                with self._fast_lane_lock:
+                    # Other threads may be reading this template's levels, so
+                    # replace them rather than appending in place. If another
+                    # thread learned this level first, that's the same level.
+                    if len(self._templates.get(key, ())) == level:
+                        self._templates[key] = levels
+                        self._fast_lane_size += len(new_level[1])
+
+            quality, leaves = levels[level]
+            if quality is None:
+                # There's no valid complete state at all.
+                return segments[::2], raw, []
+
+            results = []
+            for state, substitutions, constraints in leaves:
+                if substitutions:
+                    try:
+                        value = {
+                            category: descriptions[idx][1][kind]
+                            for category, idx, kind in substitutions
+                        }
+                    except KeyError:
+                        # This input's tokens don't have all these choices.
+                        continue
+                    state = state._replace(value=state.value._replace(**value))
+                if not all(constraint(state.value) for constraint in constraints):
+                    continue
+                century = state.century()
+                if century is not None:
+                    results.append((state, century))
+            if results:
+                if not learned:
+                    with self._fast_lane_lock:
+                        self._fast_lane_hits += 1
+                if len(results) > 1:
+                    plan = self._plan(s, segments=segments)
+                    results.sort(key=self._search_order(plan[2].remaining_groups))
+                return segments[::2], raw, results
+
+    def _shape(self, s):
+        """
+        :return: `s` with every digit replaced by 0, except those that a
+            keyword could include; inputs with the same shape are split into
+            tokens at the same places
+        """
+
+        shape = s.translate(_zero_digits)
+        if self._guarded_digits is not None:
+            # Keep as many digits after each guard as a keyword could use.
+            guarded, guards = self._guarded_digits
+            for match in guarded.finditer(s):
+                start = match.start()
+                end = start + 1 + guards.get(s[start].casefold(), len(match.group()))
+                shape = shape[:start] + s[start:end] + shape[end:]
+        return shape
+
+    # Bounds on the fast lane's memory use: how many shapes, templates, and
+    # complete states it remembers in all, how many levels of scores for
+    # inputs whose best-looking explanations are rarely valid, and how many
+    # distinct tokens it remembers descriptions of. Also, how many times it
+    # may learn something new before what it learned has to start paying
+    # off.
+    _max_fast_lane_size = 16384
+    _max_levels = 4
+    _max_described = 4096
+    _learning_grace = 256
+
+    def _may_learn(self):
+        """
+        Decide whether the fast lane may learn one more shape or template
+        level. When it's already holding as many entries as it may, it
+        starts over.
+
+        After a grace period, learning is allowed only as often as the fast
+        lane answers an input without learning anything, since each time it
+        learns costs about as much as one such answer saves. So when inputs
+        rarely match a template learned before, the fast lane soon stops
+        learning and hardly costs anything.
+
+        Threads sharing a parser share what it has learned, so the counts
+        this goes by are only changed while holding a lock.
+        """
+
+        with self._fast_lane_lock:
+            if self._fast_lane_learned > self._learning_grace + self._fast_lane_hits:
+                return False
+            self._fast_lane_learned += 1
+            if self._fast_lane_size >= self._max_fast_lane_size:
+                # Other threads may be using the current tables, so replace
+                # them rather than clearing them.
+                self._shapes = {}
+                self._templates = {}
+                self._fast_lane_size = 0
+            self._fast_lane_size += 1
+            return True
+
+    def _describe(self, token):
+        """
+        :return: a description of `token` for :py:meth:`_recognize`, and the
+            value of each of its choices by kind; or the token itself and
+            :py:obj:`None` if it's only like itself
+        """
+
+        token = token.casefold()
+        analysis = self._tokens.get(token)
+        if analysis is None:
+            analysis = self._analyze(token)
+        is_number, choices = analysis
+        kinds = _choice_kinds(choices)
+        if token in self._prefix_hints or token in self._suffix_hints:
+            # Which hints a token gives depends on the whole token.
+            return token, None
+        if len(set(kinds)) != len(kinds):
+            # Choices that share a kind can't be told apart by it.
+            return token, None
+        values = dict(zip(kinds, [choice[2] for choice in choices]))
+        if is_number and token not in self.locale_set.keywords:
+            return _number_descriptions[int(token) > 99], values
+        return (is_number, frozenset(kinds)), values
+
+    def _template_level(self, s, segments, descriptions, below):
+        """
+        Search as if each token had every kind of choice its description
+        allows, and as if every value constraint held, for the best complete
+        states that score less than `below`; and note how to check each of
+        them against the values of an input.
+
+        :param below: the score of the previous level, or :py:obj:`None`
+            for the first level
+        :return: the score of this level, or :py:obj:`None` if there are no
+            more complete states; and tuples of a complete state, the
+            category, token index, and kind of choice of each value to
+            substitute, and the value constraints which apply to it
         """
 
-        segments = self.compiled.split(self._whitespace.sub(" ", s))
+        # Each choice of a described token stands for the value of that kind
+        # of choice, whatever it is for each input.
+        analyses = [
+            None if values is None else (description[0], tuple(
+                (category, fmt, (category, fmt, locales, hint), locales, hint)
+                for category, fmt, locales, hint in description[1]
+            ))
+            for description, values in descriptions
+        ]
+        plan = self._plan(s, segments=segments, analyses=analyses)
+        if plan is None:
+            return None, ()
+        literals, raw, root, numeric = plan
+        root = root._replace(remaining_groups=tuple(
+            (category, options, position, (), positions)
+            for category, options, position, value, positions in root.remaining_groups
+        ))
+
+        def check(state):
+            if not state.date_present and not state.time_present:
+                return None
+            if below is not None and state.final_score()[0] >= below:
+                return None
+            return 0
+        leaves = self._depth_first(root, numeric, None, check=check)
+        if not leaves:
+            return None, ()
+
+        template = []
+        for state, century in leaves:
+            substitutions = tuple(
+                (category, pos, kind)
+                for category, pos, kind in zip(_DateTime._fields, state.pos, state.value)
+                if pos is not None and analyses[pos] is not None
+            )
+            constraints = tuple(
+                f
+                for f, required, revisit in _value_constraints
+                if all(getattr(state.pos, c) is not None for c in required)
+            )
+            template.append((state, substitutions, constraints))
+        return leaves[0][0].score()[0], tuple(template)
+
+    def _plan(self, s, stats=None, segments=None, analyses=None):
+        """
+        Split `s` into tokens and work out which conversions each token could
+        be, in the order the search should consider them.
+
+        :param segments: if provided, what the tokenizer already split `s`
+            into, after collapsing runs of whitespace
+        :param analyses: if provided, what to use instead of the analysis of
+            each token for which it's not :py:obj:`None`
+
+        :return: the literal text between tokens, the tokens themselves, the
+            root state of the search, and the positions of numeric tokens; or
+            :py:obj:`None` if `s` can't contain a date or time
+        """
+
+        if self._generation != self.locale_set.generation:
+            self._sync()
+
+        if segments is None:
+            segments = self._tokenizer.split(self._whitespace.sub(" ", s))
         literals = segments[::2]
         raw = segments[1::2]
 
         if not raw:
-            return []
+            return None
 
         case = list(map(str.casefold, raw))
-        prefixes = [{}] + [dict(self.locale_set.prefixes.get(match, ())) for match in case[:-1]]
-        suffixes = [dict(self.locale_set.suffixes.get(match, ())) for match in case[1:]] + [{}]
-
-        groups = _DateTime(**{ field: [] for field in _DateTime._fields })
+        tokens = self._tokens
+        keywords = self.locale_set.keywords
+        is_numeric = _Tokenizer._is_numeric
+        prefix_hints = self._prefix_hints
+        suffix_hints = self._suffix_hints
+        no_hints = {}
+        analyzed = 0
+        prefixes = [no_hints] + [prefix_hints.get(match, no_hints) for match in case[:-1]]
+        suffixes = [suffix_hints.get(match, no_hints) for match in case[1:]] + [no_hints]
+
+        groups = { field: [] for field in _DateTime._fields }
         choices_per_position = {}
         always_literal = set()
         numeric = set()
-        for idx, (prefix, suffix) in enumerate(zip(prefixes, suffixes)):
-            keyword = self._lookup_keyword(raw[idx])
-            if "y" in prefix:
-                prefix["C"] = tuple(set(prefix["y"] + prefix.get("C", ())))
-            if not keyword:
+        for idx, (token, prefix, suffix) in enumerate(zip(case, prefixes, suffixes)):
+            analysis = tokens.get(token) if analyses is None or analyses[idx] is None else analyses[idx]
+            if analysis is None:
+                if not token.isascii() and token.isdecimal() and token not in keywords:
+                    # Digits from other scripts, like "۰۹", mean the same as
+                    # the ASCII digits, so long as no locale spells a keyword
+                    # with either.
+                    analysis = tokens.get(str(int(token)).zfill(len(token)))
+                    if analysis is not None and any(choice[3] is not None for choice in analysis[1]):
+                        analysis = None
+                if analysis is None:
+                    analysis = self._analyze(token)
+                    analyzed += 1
+                    # Tokens which aren't numbers are keywords, prefixes, or
+                    # suffixes, so there are only so many to remember.
+                    if not is_numeric(token):
+                        tokens[token] = analysis
+            is_number, choices = analysis
+            if not choices:
                 always_literal.add(idx)
-            else:
-                if raw[idx].isdigit():
-                    numeric.add(idx)
-                choices_per_position[idx] = len(keyword)
-                for fmt, value, locales in keyword:
-                    category = fmt[-1]
-                    if category == "b":
-                        # Month-names should be treated like numeric months.
-                        category = "m"
-                    elif category == "z":
-                        category = "Z"
-                    getattr(groups, category).append(_Assignment(
-                        fmt=fmt,
-                        pos=idx,
-                        value=value,
-                        locales=locales,
-                        prefix=prefix.get(fmt[-1]),
-                        suffix=suffix.get(fmt[-1]),
-                    ))
+                continue
+            if is_number:
+                numeric.add(idx)
+            choices_per_position[idx] = len(choices)
+            for category, fmt, value, locales, hint in choices:
+                groups[category].append(_Assignment(idx, value, fmt, locales, prefix.get(hint), suffix.get(hint)))
+        groups = _DateTime(**groups)
         numeric = frozenset(numeric)
 
+        if stats is not None:
+            stats["tokens"] += len(raw)
+            stats["analyzed"] += analyzed
+
         # If a required date field is unsatisfiable, this is not a date.
         if not all(getattr(groups, category) for category in _State._min_date_formats):
             for category in _State._all_date_formats:
@@ -143,7 +944,19 @@ class DateParser(object):
                 choices_per_position[assignment.pos],
             ))
 
-        required_formats = _State._min_date_formats + _State._min_time_formats
+        required_formats = _State._required_formats
+        present = frozenset(
+            category
+            for category, group in zip(groups._fields, groups)
+            if group
+        )
+        # A value constraint can only fire once all its required categories
+        # are assigned, so don't let one that never will reorder the search.
+        value_constraints = [
+            (f, required, revisit)
+            for f, required, revisit in _value_constraints
+            if present.issuperset(required)
+        ]
         groups = OrderedDict(sorted(
             (
                 (
@@ -157,7 +970,7 @@ class DateParser(object):
                         ),
                         tuple(
                             (f, required)
-                            for f, required, revisit in _value_constraints
+                            for f, required, revisit in value_constraints
                             if category in required or category in revisit
                         ),
                     )
@@ -170,13 +983,20 @@ class DateParser(object):
 
         # We've already filtered out all possibilities; there's nothing here.
         if not groups:
-            return []
+            return None
 
         constrained_groups = []
         while groups:
             category, (group, position, value) = groups.popitem(last=False)
-            constrained_groups.append((category, group, position, value))
-            required = frozenset(itertools.chain.from_iterable(required for f, required in itertools.chain(position, value)))
+            positions = frozenset(assignment.pos for assignment in group)
+            constrained_groups.append((category, group, position, value, positions))
+            required = frozenset(itertools.chain.from_iterable(
+                required
+                for f, required in itertools.chain(position, value)
+                # Pulling the whole date forward to check the weekday sooner
+                # costs more than it prunes.
+                if f is not valid_weekday
+            ))
             if required:
                 required = [
                     category
@@ -185,58 +1005,135 @@ class DateParser(object):
                 ]
                 for category in required:
                     groups.move_to_end(category, last=False)
-        groups = constrained_groups
+
+        root = _State.root(
+            remaining_groups=tuple(constrained_groups),
+            unconverted=frozenset(always_literal),
+        )
+        return literals, raw, root, numeric
+
+    def _adaptive_search(self, root, numeric, stats):
+        """
+        Search in the order the planner picks, and tell it how that went.
+
+        Results that tie are found in a different order when the search
+        order changes. Both strategies find ties in the order of which
+        choice they made for each category, in search order, so sorting by
+        those choices in the default order puts them back the way the
+        default plan would have found them.
+        """
+
+        default = root.remaining_groups
+        signature = "".join(group[0] for group in default)
+        ordering = self.planner.choose(signature)
+        if ordering != signature:
+            by_category = { group[0]: group for group in default }
+            root = root._replace(remaining_groups=tuple(by_category[category] for category in ordering))
+
+        search_stats = Counter()
+        leaves = list(self._search(root, numeric, search_stats))
+        self.planner.record(signature, ordering, search_stats["generated"])
+        if stats is not None:
+            stats.update(search_stats)
+
+        if ordering != signature and len(leaves) > 1:
+            leaves.sort(key=self._search_order(default))
+        return leaves
+
+    @staticmethod
+    def _search_order(groups):
+        """
+        :param groups: the remaining groups of a root state
+        :return: a key for sorting complete states, each with its century,
+            into the order a search of `groups` would find them in, going by
+            which choice each made for each category
+        """
+
+        def choices(leaf):
+            state = leaf[0]
+            key = []
+            for category, options, position, value, positions in groups:
+                pos = getattr(state.pos, category)
+                fmt = getattr(state.fmts, category)
+                value = getattr(state.value, category)
+                key.append(next((
+                    idx
+                    for idx, assignment in enumerate(options)
+                    if assignment.pos == pos and assignment.fmt == fmt and assignment.value == value
+                ), len(options)))
+            return key
+        return choices
+
+    def _heuristic(self, state):
+        """
+        Admissable heuristic: compute the best score each remaining group
+        could possibly achieve. Don't count conversion specifiers that we've
+        already used, but don't worry about conflicts in the groups we haven't
+        assigned yet. Any such conflicts can only reduce the resulting score,
+        and we only need to make sure that the heuristic is at least as large
+        as the true value of the best leaf in this subtree. However, the more
+        precise we can be here, the fewer nodes we have to search, so we can
+        spend some CPU time on precision and still come out ahead.
+        """
+
+        # Choices at positions already used were narrowed away by
+        # _State._narrow, so the best choice left is the first.
+        return len(state.pending_hints) + sum(
+            self._optimistic_score(group[1][0])
+            for group in state.remaining_groups
+            if group[1]
+        )
+
+    def _depth_first(self, root, numeric, stats, check=None, trace=None):
+        """
+        Find the best-scoring complete states below `root`, exploring the
+        search tree depth-first.
+
+        :param check: function which returns the century of a complete
+            state, or :py:obj:`None` if it's invalid; defaults to
+            :py:meth:`_State.century`
+        :param list trace: if provided, append the category to assign next,
+            the bound on score, and the depth of the stack, for each state
+            expanded below `root`
+        :return: each best state, with the century its date falls in
+        :rtype: list(tuple(_State, int))
+        """
+
+        if check is None:
+            check = _State.century
 
         best_quality = 0
         best_candidates = []
+        expanded = 1
+        generated = 0
 
-        partials = [
-            _State.empty._replace(
-                unconverted=frozenset(always_literal),
-                remaining_groups=tuple(groups),
-            ).children(numeric=numeric)
-        ]
+        partials = [root.children(numeric=numeric)]
         while partials:
             try:
-                quality, locales, state = next(partials[-1])
+                quality, state = next(partials[-1])
             except StopIteration:
                 partials.pop()
                 continue
+            generated += 1
 
             if state.remaining_groups:
-                # Admissable heuristic: compute the best score each group
-                # could possibly achieve. Don't count conversion specifiers
-                # that we've already used, but don't worry about conflicts
-                # in the groups we haven't assigned yet. Any such conflicts
-                # can only reduce the resulting score, and we only need to
-                # make sure that the heuristic is at least as large as the
-                # true value of the best leaf in this subtree. However, the
-                # more precise we can be here, the fewer nodes we have to
-                # search, so we can spend some CPU time on precision and
-                # still come out ahead.
-                assigned = state.unconverted.union(state.pos).difference((None,))
-                heuristic = len(state.pending_hints) + sum(
-                    next((
-                        self._optimistic_score(assignment)
-                        for assignment in group[1]
-                        if assignment.pos not in assigned
-                    ), 0)
-                    for group in state.remaining_groups
-                )
-
-                if quality + heuristic < best_quality:
+                bound = quality + self._heuristic(state)
+                if bound < best_quality:
                     # Even assuming the remaining groups get the highest
                     # possible score, this state is still not good enough.
                     continue
 
+                if trace is not None:
+                    trace.append((state.remaining_groups[0][0], bound, len(partials)))
                 partials.append(state.children(numeric=numeric))
+                expanded += 1
                 continue
 
-            value = state.valid()
-            if value is None:
+            century = check(state)
+            if century is None:
                 continue
 
-            quality, locales, state = state.final_score()
+            quality, state = state.final_score()
 
             if best_quality is not None and quality < best_quality:
                 # We've seen better, so skip this one.
@@ -246,20 +1143,79 @@ class DateParser(object):
                 best_quality = quality
                 best_candidates = []
 
-            conversions = dict(zip(state.pos, state.fmts))
-            fmts = [ conversions.get(idx) or literal for idx, literal in enumerate(raw) ]
+            # Building the result is left until we know this candidate
+            # survives, and even then only as much as the caller asks for.
+            best_candidates.append((state, century))
 
-            pattern = ''.join(lit + fmt for lit, fmt in zip(literals, fmts + [''])).replace("%C%y", "%Y")
-            best_candidates.append((pattern, value, locales))
+        if stats is not None:
+            stats["expanded"] += expanded
+            stats["generated"] += generated
         return best_candidates
 
+    def _best_first(self, root, numeric, stats, trace=None):
+        """
+        Find the best-scoring complete states below `root`, always exploring
+        next the state whose score plus heuristic is highest.
+
+        Complete states are scored exactly when they're generated and then
+        wait their turn like any other, so each one comes off the queue only
+        once no other state could lead to anything better: it's proven to be
+        among the best. Ties are broken by the path from the root, so the
+        results come out in the same order as from :py:meth:`_depth_first`.
+
+        :param list trace: if provided, append the category to assign next,
+            the bound on score, and the size of the queue, for each state
+            expanded below `root`
+        :return: each best state, with the century its date falls in, as
+            soon as it is known to be one of the best
+        :rtype: iterator(tuple(_State, int))
+        """
+
+        best_quality = 0
+        expanded = 0
+        generated = 0
+
+        # Entries are (negated bound, path, century, state), where century is
+        # None for states that are not yet complete.
+        frontier = [(0, (), None, root)]
+        try:
+            while frontier and -frontier[0][0] >= best_quality:
+                bound, path, century, state = heapq.heappop(frontier)
+                if century is not None:
+                    best_quality = -bound
+                    yield state, century
+                    continue
+
+                expanded += 1
+                if trace is not None and path:
+                    trace.append((state.remaining_groups[0][0], -bound, len(frontier)))
+                for idx, (quality, child) in enumerate(state.children(numeric=numeric)):
+                    generated += 1
+                    century = None
+                    if child.remaining_groups:
+                        bound = quality + self._heuristic(child)
+                    else:
+                        century = child.century()
+                        if century is None:
+                            continue
+                        bound, child = child.final_score()
+                    if bound < best_quality:
+                        continue
+                    heapq.heappush(frontier, (-bound, path + (idx,), century, child))
+        finally:
+            if stats is not None:
+                stats["expanded"] += expanded
+                stats["generated"] += generated
+
     def _lookup_keyword(self, raw):
         keyword = raw.casefold()
         found = self.locale_set.keywords.get(keyword)
         if found:
             ret = []
             for fmt, value, locales in found:
-                locales = frozenset(locales)
+                # Many keywords are used in exactly the same locales, so
+                # share one set among all of them.
+                locales = self._localesets.setdefault(locales, frozenset(locales))
                 if fmt == "O":
                     ret.extend(self._legal_number("%O", value, locales))
                 else:
@@ -267,7 +1223,13 @@ class DateParser(object):
             return tuple(ret)
         if keyword[0] in "+-":
             if keyword[1:].isdigit():
-                return (("%z", keyword, None),)
+                hours = int(keyword[1:3])
+                minutes = int(keyword[3:])
+                if hours < 24 and minutes < 60:
+                    offset = datetime.timedelta(hours=hours, minutes=minutes)
+                    if keyword[0] == "-":
+                        offset = -offset
+                    return (("%z", offset, None),)
         elif keyword.isdigit():
             return tuple(self._legal_number("%", int(keyword), None))
         return ()
@@ -291,6 +1253,385 @@ class DateParser(object):
     def _optimistic_score(assignment):
         return 1 + (assignment.prefix is not None) + (assignment.suffix is not None)
 
+_unset = object()
+
+class ParseResult(object):
+    """
+    One way to explain a timestamp, as returned by :py:meth:`DateParser.parse`
+    when `lazy` is set. Each attribute is computed the first time it's used,
+    so callers which only need, say, the format string never pay for building
+    a :py:mod:`datetime` object or a set of locales.
+
+    Iterating over a result produces its format, value, and locales, so it
+    can be unpacked, indexed, and compared just like the tuples that
+    :py:meth:`DateParser.parse` returns by default.
+    """
+
+    __slots__ = ("_state", "_century", "_raw", "_literals", "_tz_offsets", "_format", "_value", "_locales", "_offsets")
+
+    def __init__(self, state, century, raw, literals, tz_offsets):
+        self._state = state
+        self._century = century
+        self._raw = raw
+        self._literals = literals
+        self._tz_offsets = tz_offsets
+        self._format = _unset
+        self._value = _unset
+        self._locales = _unset
+        self._offsets = _unset
+
+    @property
+    def format(self):
+        """
+        The format string, in :manpage:`strftime(3)` syntax.
+        """
+
+        if self._format is _unset:
+            self._format = self._state.pattern(self._raw, self._literals)
+        return self._format
+
+    @property
+    def value(self):
+        """
+        The :py:class:`datetime.date`, :py:class:`datetime.time`, or
+        :py:class:`datetime.datetime` which the timestamp represents under
+        this format. Times are timezone-aware if the timestamp included a UTC
+        offset, or a timezone abbreviation with only one possible offset.
+        """
+
+        if self._value is _unset:
+            self._value = self._state.convert(self._century, self.offsets)
+        return self._value
+
+    @property
+    def offsets(self):
+        """
+        The UTC offsets, as :py:class:`datetime.timedelta` objects, which the
+        timestamp's timezone could stand for. This is empty if there was no
+        timezone, and may have several entries for an abbreviation like
+        "IST" which has meant different offsets in different places.
+        """
+
+        if self._offsets is _unset:
+            self._offsets = self._state.offsets(self._tz_offsets, self._literals)
+        return self._offsets
+
+    @property
+    def locales(self):
+        """
+        The locales which best explain the timestamp, or :py:obj:`None` if
+        any locale would do.
+        """
+
+        if self._locales is _unset:
+            self._locales = self._state.locales()
+        return self._locales
+
+    _fields = ("format", "value", "locales")
+
+    def __iter__(self):
+        yield self.format
+        yield self.value
+        yield self.locales
+
+    def __len__(self):
+        return len(self._fields)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return tuple(getattr(self, field) for field in self._fields[idx])
+        return getattr(self, self._fields[idx])
+
+    def __eq__(self, other):
+        if isinstance(other, (ParseResult, tuple)):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return "ParseResult(format={!r}, value={!r}, locales={!r})".format(*self)
+
+class ParseSession(object):
+    """
+    Parse successive versions of one input as it's edited, as returned by
+    :py:meth:`DateParser.session`. Results are the same as from
+    :py:meth:`DateParser.parse`, but each parse only tokenizes again from
+    just before where the input changed. Which results the search finds
+    depends only on the tokens, not on the literal text around them, so
+    when an edit leaves the tokens the same as in some recent version of
+    the input, as when typing spaces or deleting the last few characters
+    typed, the session reuses that search.
+
+    >>> session = DateParser(TimeLocaleSet()).session()
+    >>> for end in range(1, 11):
+    ...     results = session.parse("2018/01/09"[:end])
+    >>> results
+    [('%Y/%m/%d', datetime.date(2018, 1, 9), None), ('%Y/%d/%m', datetime.date(2018, 9, 1), None)]
+    >>> from collections import Counter
+    >>> stats = Counter()
+    >>> session.parse("2018/01/09 ", stats=stats)
+    [('%Y/%m/%d ', datetime.date(2018, 1, 9), None), ('%Y/%d/%m ', datetime.date(2018, 9, 1), None)]
+    >>> stats["reused"], stats["expanded"]
+    (1, 0)
+
+    A session remembers things about the input it saw last, so use a
+    separate session for each input, and don't share one between threads.
+    """
+
+    def __init__(self, parser, size):
+        self.parser = parser
+        self.size = size
+        self._generation = None
+        self._tokenizer = None
+        self._input = ""
+        self._segments = None
+        self._searched = OrderedDict()
+
+    def parse(self, s, lazy=False, stats=None):
+        """
+        :param str s: the current version of the input
+        :param bool lazy: as for :py:meth:`DateParser.parse`
+        :param collections.Counter stats: as for :py:meth:`DateParser.parse`,
+            except that if the search for these tokens was remembered from
+            earlier in the session, it's counted as ``"reused"`` instead
+        :return: as for :py:meth:`DateParser.parse`
+        """
+
+        parser = self.parser
+        if parser._generation != parser.locale_set.generation:
+            parser._sync()
+        if self._generation != parser._generation:
+            # The locale set has changed, so earlier searches may be wrong.
+            self._generation = parser._generation
+            self._searched.clear()
+
+        recognized = parser._recognize(s)
+        if recognized is not None:
+            if stats is not None:
+                stats["recognized"] += 1
+            literals, raw, leaves = recognized
+            return [parser._result(state, century, raw, literals, lazy) for state, century in leaves]
+
+        normalized = parser._whitespace.sub(" ", s)
+        tokenizer = parser._tokenizer
+        if tokenizer is self._tokenizer:
+            stable = len(os.path.commonprefix((self._input, normalized)))
+            segments = tokenizer.resplit(normalized, stable, self._segments)
+        else:
+            segments = tokenizer.split(normalized)
+        self._tokenizer = tokenizer
+        self._input = normalized
+        self._segments = segments
+
+        literals = segments[::2]
+        raw = segments[1::2]
+        key = tuple(raw)
+        leaves = self._searched.get(key)
+        if leaves is not None:
+            self._searched.move_to_end(key)
+            if stats is not None:
+                stats["reused"] += 1
+        else:
+            leaves = ()
+            plan = parser._plan(s, stats, segments)
+            if plan is not None:
+                root, numeric = plan[2:]
+                if parser.planner is None:
+                    leaves = parser._search(root, numeric, stats)
+                else:
+                    leaves = parser._adaptive_search(root, numeric, stats)
+            self._searched[key] = leaves
+            if len(self._searched) > self.size:
+                self._searched.popitem(last=False)
+        return [parser._result(state, century, raw, literals, lazy) for state, century in leaves]
+
+class _Tokenizer(object):
+    """
+    Split strings into literal text alternating with numbers and known
+    keywords, like the :py:meth:`~re.Pattern.split` method of a single regular
+    expression that matches any of them.
+
+    The strings are compiled as a trie, so that where many of them share a
+    prefix, such as the numerals "十", "十一", and so on through "十九", the
+    expression only checks that prefix once. Alternatives are still tried
+    in the same order as a flat list of strings sorted in reverse, so
+    wherever several strings match, the longest one wins.
+
+    Compiling that expression is expensive for a large locale set, so strings
+    learned after construction go into a second, smaller expression, and
+    :py:meth:`split` merges the matches from both. Once the second expression
+    grows to a sizable fraction of the first, everything is recompiled
+    together, so the total cost stays proportional to the number of strings
+    added.
+    """
+
+    _numeric = r'\d{1,2}|[+-]\d{4}'
+    _is_numeric = re.compile(_numeric).fullmatch
+    _numeric_length = 5
+
+    def __init__(self, strings, extra=()):
+        self.strings = frozenset(strings)
+        self.extra = frozenset(extra)
+        # Whether a token starts at some position, and which one, depends
+        # on at most this many characters from there on.
+        self.window = max(itertools.chain((self._numeric_length,), map(len, self.strings), map(len, self.extra)))
+        self.base = self._compile(self._numeric, self.strings)
+        self.extra_compiled = None
+        if self.extra:
+            self.extra_compiled = self._compile(None, self.extra)
+
+    @classmethod
+    def _compile(cls, numeric, strings):
+        trie = {}
+        for s in strings:
+            node = trie
+            for char in s:
+                node = node.setdefault(char, {})
+            node[None] = None
+        alternatives = cls._alternatives(trie)
+        if numeric is not None:
+            alternatives.insert(0, numeric)
+        return re.compile('(' + '|'.join(alternatives) + ')', re.I)
+
+    @classmethod
+    def _alternatives(cls, node):
+        # Trying longer strings first, and among the characters that could
+        # come next, the greatest first, is the same as trying every string
+        # in reverse-sorted order.
+        alternatives = []
+        for char in sorted((char for char in node if char is not None), reverse=True):
+            rest = cls._alternatives(node[char])
+            if not rest:
+                rest = ""
+            elif len(rest) == 1 and None not in node[char]:
+                rest = rest[0]
+            else:
+                rest = "(?:" + "|".join(rest) + ")"
+                if None in node[char]:
+                    rest += "?"
+            alternatives.append(re.escape(char) + rest)
+        return alternatives
+
+    def extend(self, strings):
+        """
+        :return: a tokenizer which also recognizes `strings`; possibly this
+            one, if none of them are new
+        """
+
+        new = set(strings).difference(self.strings, self.extra)
+        if not new:
+            return self
+        new.update(self.extra)
+        if len(new) * 4 > len(self.strings):
+            return _Tokenizer(self.strings.union(new))
+        return _Tokenizer(self.strings, new)
+
+    def split(self, s):
+        if self.extra_compiled is None:
+            return self.base.split(s)
+
+        base_search = self.base.search
+        extra_search = self.extra_compiled.search
+        segments = []
+        pos = 0
+        base = base_search(s, pos)
+        extra = extra_search(s, pos)
+        while base is not None or extra is not None:
+            # Prefer the leftmost match. At the same position, numbers take
+            # priority, and otherwise the longest keyword wins, just as it
+            # would among reverse-sorted alternatives in a single expression.
+            if extra is None or base is not None and (
+                base.start() < extra.start() or
+                base.start() == extra.start() and (
+                    base.end() >= extra.end() or
+                    self._is_numeric(base.group()) is not None
+                )
+            ):
+                match = base
+            else:
+                match = extra
+            segments.append(s[pos:match.start()])
+            segments.append(match.group(1))
+            pos = match.end()
+            if base is not None and base.start() < pos:
+                base = base_search(s, pos)
+            if extra is not None and extra.start() < pos:
+                extra = extra_search(s, pos)
+        segments.append(s[pos:])
+        return segments
+
+    def resplit(self, s, stable, segments):
+        """
+        Split `s`, reusing the tokens found in an earlier string that was
+        split into `segments`, as far as they can't have changed.
+
+        :param int stable: how many characters at the start of `s` are the
+            same as in the earlier string
+        """
+
+        # Every token which starts at least a window before the first change
+        # was found by looking only at unchanged text, and so was the lack
+        # of tokens before it.
+        limit = stable - self.window
+        pos = 0
+        keep = 0
+        for idx in range(1, len(segments), 2):
+            start = pos + len(segments[idx - 1])
+            if start > limit:
+                break
+            pos = start + len(segments[idx])
+            keep = idx + 1
+        return segments[:keep] + self.split(s[pos:])
+
+# Well-known timestamp formats, checked after runs of whitespace have been
+# collapsed. Matching one of these only makes an input eligible for
+# DateParser._recognize; it doesn't decide how the input is parsed.
+_well_known = re.compile(r"""
+    # ISO 8601 and RFC 3339
+    [0-9]{4}-?[0-9]{2}-?[0-9]{2}
+    (?:[T\ ][0-9]{2}(?::?[0-9]{2}(?::?[0-9]{2}(?:[.,][0-9]+)?)?)?)?
+    (?:Z|[+-][0-9]{2}(?::?[0-9]{2})?)?
+|
+    # RFC 2822 and 5322
+    (?:[A-Za-z]{3},\ )?[0-9]{1,2}\ [A-Za-z]{3}\ [0-9]{2,4}
+    \ [0-9]{2}:[0-9]{2}(?::[0-9]{2})?
+    (?:\ (?:[+-][0-9]{4}|[A-Za-z]{1,5}))?
+|
+    # ctime and date(1)
+    [A-Za-z]{3}\ [A-Za-z]{3}\ [0-9]{1,2}\ [0-9]{2}:[0-9]{2}:[0-9]{2}
+    (?:\ [A-Za-z]{1,5})?\ [0-9]{4}
+|
+    # syslog
+    [A-Za-z]{3}\ [0-9]{1,2}\ [0-9]{2}:[0-9]{2}:[0-9]{2}
+|
+    # Common Log Format
+    [0-9]{2}/[A-Za-z]{3}/[0-9]{4}:[0-9]{2}:[0-9]{2}:[0-9]{2}\ [+-][0-9]{4}
+""", re.X)
+
+_zero_digits = str.maketrans("0123456789", "0000000000")
+
+def _choice_kinds(choices):
+    """
+    :return: everything about a token's choices except their values
+    """
+    return tuple(
+        (category, fmt, locales, hint)
+        for category, fmt, value, locales, hint in choices
+    )
+
+# How DateParser._describe describes a number which isn't a keyword, if
+# it's up to 99 and if it's over: by every kind of choice any number in
+# that range has.
+_number_descriptions = tuple(
+    (True, frozenset(itertools.chain.from_iterable(
+        _choice_kinds(DateParser._choices(DateParser._legal_number("%", value, None)))
+        for value in values
+    )))
+    for values in (range(100), (100,))
+)
+
 _position_constraints = []
 
 def month_near_day(pos):
@@ -344,9 +1685,87 @@ def valid_12_hour_clock(value):
     return 1 <= value.H <= 12
 _value_constraints.append((valid_12_hour_clock, "Hp", ""))
 
+def _first_century(value):
+    """
+    Pick the century that a date falls in, if there's any century where it's
+    a real date on the right day of the week.
+    """
+
+    # TODO: disambiguate missing century around a configurable date
+    if value.C is not None:
+        centuries = (value.C,)
+    elif value.y == 0 and value.m == 2 and value.d == 29:
+        # Among years divisible by 100, only those that are also
+        # divisible by 400 are leap years. So 2000 is the only nearby
+        # year that could work in this case.
+        centuries = (20,)
+    elif value.a is not None:
+        # If we know the weekday, a two-digit year is unambiguous
+        # within a four-century window. Let's just guess in a window
+        # around the 20th/21st centuries.
+        centuries = (20, 19, 21, 18)
+    else:
+        # If all else fails, use the current POSIX rule for how
+        # strptime interprets two-digit years.
+        if value.y <= 68:
+            centuries = (20,)
+        else:
+            centuries = (19,)
+
+    # The day of the month has already been checked, so only the year and
+    # weekday are left to check.
+    for C in centuries:
+        year = C * 100 + value.y
+        if year < datetime.MINYEAR:
+            continue
+        if value.a is None:
+            return C
+        if (datetime.date(year, value.m, value.d).weekday() + 1) % 7 == value.a:
+            return C
+    return None
+
+def valid_weekday(value):
+    """
+    As soon as the weekday and the rest of the date are known, check that
+    they agree in some century we'd consider, instead of searching all the
+    time fields before finding out they don't.
+
+    This is safe even if the century hasn't been assigned yet: the calendar
+    repeats every four centuries, so if no century in the default window
+    fits, neither will whichever century gets assigned later.
+    """
+    return _first_century(value) is not None
+_value_constraints.append((valid_weekday, "ymda", "C"))
+
+def valid_year(value):
+    # There was no year 0.
+    return value.C != 0 or value.y != 0
+_value_constraints.append((valid_year, "Cy", ""))
+
+def valid_second(value):
+    # Python's time type can't represent leap seconds.
+    return value.S <= 59
+_value_constraints.append((valid_second, "S", ""))
+
 _DateTime = namedtuple("_DateTime", list("CymdaHMSpZ"))
 _DateTime.empty = _DateTime(**dict.fromkeys(_DateTime._fields, None))
 
+# For each category, the constraints on other categories which assigning it
+# can make ready to check: the category they constrain, the constraint, the
+# indexes of the categories besides that one which must be assigned first,
+# and whether it's a position constraint.
+_triggers = {category: [] for category in _DateTime._fields}
+for f, required in _position_constraints:
+    for category in required:
+        for constrained in required.replace(category, ""):
+            others = tuple(_DateTime._fields.index(c) for c in required.replace(constrained, ""))
+            _triggers[category].append((constrained, f, others, True))
+for f, required, revisit in _value_constraints:
+    for category in required + revisit:
+        for constrained in required.replace(category, ""):
+            others = tuple(_DateTime._fields.index(c) for c in required.replace(constrained, ""))
+            _triggers[category].append((constrained, f, others, False))
+
 class _State(namedtuple("_State", (
         "remaining_groups",
         "date_present",
@@ -362,8 +1781,32 @@ class _State(namedtuple("_State", (
     ))):
     __slots__ = ()
 
+    @classmethod
+    def root(cls, remaining_groups, unconverted):
+        """
+        :return: a state with nothing assigned yet
+
+        Each search gets its own root because the hint counts in `satisfied`
+        are copied on write from here, and searches running on different
+        threads must not share a mutable counter.
+        """
+
+        return cls(
+            remaining_groups=remaining_groups,
+            date_present=False,
+            time_present=False,
+            unconverted=unconverted,
+            pos=_DateTime.empty,
+            value=_DateTime.empty,
+            fmts=_DateTime.empty,
+            required_locales=None,
+            pending_hints=(),
+            satisfied=Counter(),
+            globally_satisfied=0,
+        )
+
     def children(self, numeric):
-        category, options, position_constraints, value_constraints = self.remaining_groups[0]
+        category, options, position_constraints, value_constraints, positions = self.remaining_groups[0]
         remaining_groups = self.remaining_groups[1:]
 
         date_present = self.date_present
@@ -422,6 +1865,12 @@ class _State(namedtuple("_State", (
             if not all(constraint(value) for constraint in value_constraints):
                 continue
 
+            # Other choices at these positions are ruled out now, too.
+            taken = exclude.union((assignment.pos,)) if exclude else (assignment.pos,)
+            narrowed_groups = self._narrow(remaining_groups, category, taken, pos, value, date_present, time_present, numeric)
+            if narrowed_groups is None:
+                continue
+
             fmts = self.fmts._replace(**{category: assignment.fmt})
 
             pending_hints = list(self.pending_hints)
@@ -451,7 +1900,7 @@ class _State(namedtuple("_State", (
                     deferred_hints.append((idx, hint))
 
             new = _State(
-                remaining_groups=remaining_groups,
+                remaining_groups=narrowed_groups,
                 date_present=date_present,
                 time_present=time_present,
                 unconverted=exclude,
@@ -492,9 +1941,137 @@ class _State(namedtuple("_State", (
                 if group[0] not in self._all_time_formats
             )
 
+        if not self.date_present and not self.time_present:
+            if not any(group[0] in self._required_formats for group in remaining_groups):
+                # Nothing left in this subtree can make it a date or a time,
+                # so none of its leaves would pass century().
+                return
+
         new = self._replace(remaining_groups=remaining_groups)
         yield new.score()
 
+    def _narrow(self, remaining_groups, category, taken, pos, value, date_present, time_present, numeric):
+        """
+        Narrow the choices left for each unassigned category of a child of
+        this state to those that could still be assigned, the way
+        :py:meth:`children` would check them, so that a dead end is found
+        when the choice that causes it is made rather than once the search
+        gets to the category it leaves with no choices. For example, once
+        the month is known, days past its end are ruled out; once the year
+        and month are known, so are days on the wrong weekday; and once AM
+        or PM is known, so are hours past 12.
+
+        Everything assigned later only adds to what the choices are checked
+        against, so a choice ruled out here would be ruled out when its
+        category came up anyway, and the search finds the same results.
+        This state's choices were already narrowed, so only what assigning
+        `category` changed needs checking.
+
+        :param str category: the category the child assigned
+        :param taken: positions which that made unavailable
+        :return: the child's remaining groups, or :py:obj:`None` if some
+            category which the child must assign has no choices left
+        """
+
+        if not remaining_groups:
+            return remaining_groups
+
+        # Which constraints on other categories assigning this one enabled.
+        checks = {}
+        for constrained, f, others, is_position in _triggers[category]:
+            for idx in others:
+                if pos[idx] is None:
+                    break
+            else:
+                checks.setdefault(constrained, ([], []))[is_position].append(f)
+
+        # Whether groups without constraints to check only lose the choices
+        # at the positions just taken.
+        only_taken = category != "C"
+
+        narrowed_groups = []
+        emptied = set()
+        for group in remaining_groups:
+            group_category, options, position_constraints, value_constraints, positions = group
+            group_checks = checks.get(group_category)
+            if group_checks is None and only_taken:
+                if positions.isdisjoint(taken):
+                    # Nothing this group could choose has changed.
+                    narrowed_groups.append(group)
+                    continue
+                narrowed = [assignment for assignment in options if assignment.pos not in taken]
+            else:
+                narrowed = self._narrow_group(group, group_checks, category, taken, pos, value, numeric)
+
+            if len(narrowed) != len(options):
+                group = (group_category, narrowed, position_constraints, value_constraints, positions)
+                if not narrowed and group_category in self._required_formats:
+                    emptied.add(group_category)
+            narrowed_groups.append(group)
+
+        if emptied:
+            # With nothing left for a required date or time field, the
+            # child must not have a date or time, or it's a dead end; and
+            # then nothing else of that kind can be assigned.
+            for present, required, everything in (
+                (date_present, self._min_date_formats, self._all_date_formats),
+                (time_present, self._min_time_formats, self._all_time_formats),
+            ):
+                if emptied.isdisjoint(required):
+                    continue
+                if present:
+                    return None
+                narrowed_groups = [
+                    group
+                    for group in narrowed_groups
+                    if group[0] not in everything
+                ]
+
+        return tuple(narrowed_groups)
+
+    @staticmethod
+    def _narrow_group(group, checks, category, taken, pos, value, numeric):
+        """
+        :return: the choices in one of the groups that :py:meth:`_narrow`
+            narrows which are still possible
+        """
+
+        group_category, options, position_constraints, value_constraints, positions = group
+        narrowed = [assignment for assignment in options if assignment.pos not in taken]
+        if category == "C" and group_category != "y":
+            narrowed = [assignment for assignment in narrowed if assignment.pos - 1 != pos.C]
+        if checks is None:
+            return narrowed
+
+        value_checks, position_checks = checks
+        # _replace is slow, and this is a hot spot.
+        index = _DateTime._fields.index(group_category)
+        if position_checks:
+            # Many choices share a position, so check each just once.
+            allowed = {}
+            for assignment in narrowed:
+                if assignment.pos in allowed:
+                    continue
+                new_pos = _DateTime._make(pos[:index] + (assignment.pos,) + pos[index + 1:])
+                allowed[assignment.pos] = True
+                for constraint in position_checks:
+                    exclude = constraint(new_pos)
+                    if exclude is None or any(idx in numeric or idx in new_pos for idx in exclude):
+                        allowed[assignment.pos] = False
+                        break
+            narrowed = [assignment for assignment in narrowed if allowed[assignment.pos]]
+        # Only those constraints this group is planned to check, though.
+        value_checks = [f for f, required in value_constraints if f in value_checks]
+        if value_checks:
+            # Likewise, many choices share a value.
+            allowed = {}
+            for assignment in narrowed:
+                if assignment.value not in allowed:
+                    new_value = _DateTime._make(value[:index] + (assignment.value,) + value[index + 1:])
+                    allowed[assignment.value] = all(constraint(new_value) for constraint in value_checks)
+            narrowed = [assignment for assignment in narrowed if allowed[assignment.value]]
+        return narrowed
+
     def final_score(self):
         new = self
         if self.pending_hints:
@@ -508,86 +2085,122 @@ class _State(namedtuple("_State", (
             new = self._replace(satisfied=satisfied, globally_satisfied=globally_satisfied)
         return new.score()
 
-    def valid(self):
-        d = None
-        if self.date_present:
-            # TODO: disambiguate missing century around a configurable date
-            if self.value.C is not None:
-                centuries = (self.value.C,)
-            elif self.value.y == 0 and self.value.m == 2 and self.value.d == 29:
-                # Among years divisible by 100, only those that are also
-                # divisible by 400 are leap years. So 2000 is the only nearby
-                # year that could work in this case.
-                centuries = (20,)
-            elif self.value.a is not None:
-                # If we know the weekday, a two-digit year is unambiguous
-                # within a four-century window. Let's just guess in a window
-                # around the 20th/21st centuries.
-                centuries = (20, 19, 21, 18)
-            else:
-                # If all else fails, use the current POSIX rule for how
-                # strptime interprets two-digit years.
-                if self.value.y <= 68:
-                    centuries = (20,)
-                else:
-                    centuries = (19,)
+    def century(self):
+        """
+        Check whether this complete state describes a real date and time,
+        without constructing it. The value constraints have already ruled
+        out most invalid states by the time they're complete.
 
-            for C in centuries:
-                d = datetime.date(C * 100 + self.value.y, self.value.m, self.value.d)
-                if self.value.a is None or (d.weekday() + 1) % 7 == self.value.a:
-                    break
-            else:
+        :return: the century that the date falls in, or 0 if there is no
+            date; or :py:obj:`None` if the state is not valid
+        """
+
+        if not self.date_present and not self.time_present:
+            return None
+
+        C = 0
+        if self.date_present:
+            C = _first_century(self.value)
+            if C is None:
                 return None
 
+        return C
+
+    def offsets(self, tz_offsets, literals=()):
+        """
+        :param tz_offsets: as in :py:attr:`TimeLocaleSet.tz_offsets`
+        :param literals: the literal text between tokens, to check for an
+            ISO 8601 "Z" right after the time, which means UTC
+        :return: the UTC offsets which this state's timezone could stand for
+        """
+
+        fmt = self.fmts.Z
+        if fmt == "%z":
+            return (self.value.Z,)
+        if fmt == "%Z":
+            return tz_offsets.get(self.value.Z.casefold(), ())
+        if self.time_present and literals:
+            last = max(pos for pos in (self.pos.H, self.pos.M, self.pos.S) if pos is not None)
+            if literals[last + 1].upper() == "Z":
+                return (datetime.timedelta(0),)
+        return ()
+
+    def convert(self, century, offsets=()):
+        """
+        :param int century: as returned by :py:meth:`century`
+        :param offsets: as returned by :py:meth:`offsets`
+        :return: the date and/or time that this complete state describes,
+            with timezone information if there is exactly one offset
+        """
+
+        value = self.value
+        d = None
+        if self.date_present:
+            d = datetime.date(century * 100 + value.y, value.m, value.d)
+
         t = None
         if self.time_present:
-            H = self.value.H
-            if self.value.p is not None:
+            H = value.H
+            if value.p is not None:
                 # 12am is 00:00, and 12pm is 12:00
-                H = (H % 12) + 12 * self.value.p
-            t = datetime.time(H, self.value.M, self.value.S or 0)
+                H = (H % 12) + 12 * value.p
+            tzinfo = None
+            if len(offsets) == 1:
+                if self.fmts.Z == "%Z":
+                    tzinfo = datetime.timezone(offsets[0], value.Z)
+                else:
+                    tzinfo = datetime.timezone(offsets[0])
+            t = datetime.time(H, value.M, value.S or 0, tzinfo=tzinfo)
 
         if d and t:
             return datetime.datetime.combine(d, t)
 
         return d or t
 
+    def pattern(self, raw, literals):
+        """
+        :return: the format string that this complete state describes
+        """
+
+        conversions = dict(zip(self.pos, self.fmts))
+        fmts = [ conversions.get(idx) or literal for idx, literal in enumerate(raw) ]
+        return ''.join(lit + fmt for lit, fmt in zip(literals, fmts + [''])).replace("%C%y", "%Y")
+
+    def _satisfied(self):
+        if self.required_locales:
+            return [ (k, v) for k, v in self.satisfied.items() if k in self.required_locales ]
+        return list(self.satisfied.items())
+
     def score(self):
-        satisfied_locales = self.required_locales
+        satisfied = self._satisfied()
         locally_satisfied = 0
-        if self.required_locales:
-            satisfied = [ (k, v) for k, v in self.satisfied.items() if k in self.required_locales ]
-        else:
-            satisfied = list(self.satisfied.items())
         if satisfied:
             locally_satisfied = max(v for k, v in satisfied)
-            satisfied_locales = frozenset(
-                locale for locale, count in satisfied
-                if count == locally_satisfied
-            )
-        return self.globally_satisfied + locally_satisfied, satisfied_locales, self
+        return self.globally_satisfied + locally_satisfied, self
+
+    def locales(self):
+        """
+        :return: the locales which satisfy the most hints in this state, or
+            :py:obj:`None` if any locale would do
+        """
+
+        satisfied = self._satisfied()
+        if not satisfied:
+            return self.required_locales
+        locally_satisfied = max(v for k, v in satisfied)
+        return frozenset(
+            locale for locale, count in satisfied
+            if count == locally_satisfied
+        )
 
     _min_date_formats = "ymd"
     _all_date_formats = _min_date_formats + "Ca"
     _min_time_formats = "HM"
     _all_time_formats = _min_time_formats + "SpZ"
+    _required_formats = _min_date_formats + _min_time_formats
 
-_State.empty = _State(
-    remaining_groups=(),
-    date_present=False,
-    time_present=False,
-    unconverted=frozenset(),
-    pos=_DateTime.empty,
-    value=_DateTime.empty,
-    fmts=_DateTime.empty,
-    required_locales=None,
-    pending_hints=(),
-    satisfied=Counter(),
-    globally_satisfied=0,
-)
 
 if __name__ == "__main__":
-    import time
     import timeit
     def perf(f, repeat, number):
         #return ()
@@ -632,3 +2245,75 @@ if __name__ == "__main__":
 
     times.sort()
     print(" ".join("{:.2f}ms".format(1000 * time) for time in times))
+    print()
+
+    from percentagent.workload import Workload
+    workload = [row.string for row in Workload.default().rows(1000, seed=0)]
+    for strategy in DateParser.strategies:
+        strategy_parser = DateParser(locale_set, strategy=strategy)
+        stats = Counter()
+        start = time.process_time()
+        for example in workload:
+            strategy_parser.parse(example, stats=stats)
+        elapsed = time.process_time() - start
+        print("{}: {:.2f}ms/parse, {:.1f} states expanded and {:.1f} generated per parse".format(
+            strategy,
+            1000 * elapsed / len(workload),
+            stats["expanded"] / len(workload),
+            stats["generated"] / len(workload),
+        ))
+
+    from percentagent.planner import AdaptivePlanner
+    planner = AdaptivePlanner(seed=0)
+    adaptive_parser = DateParser(locale_set, planner=planner)
+    for row in Workload.default().rows(10000, seed=1):
+        adaptive_parser.parse(row.string)
+    planner.explore = 0
+    stats = Counter()
+    start = time.process_time()
+    for example in workload:
+        adaptive_parser.parse(example, stats=stats)
+    elapsed = time.process_time() - start
+    print("adaptive planner, after 10000 parses: {:.2f}ms/parse, {:.1f} states expanded and {:.1f} generated per parse".format(
+        1000 * elapsed / len(workload),
+        stats["expanded"] / len(workload),
+        stats["generated"] / len(workload),
+    ))
+
+    import random
+    rng = random.Random(0)
+    well_known = []
+    for fmt in ("%Y-%m-%dT%H:%M:%SZ", "%a, %d %b %Y %H:%M:%S +0000", "%a %b %e %H:%M:%S PST %Y", "%b %e %H:%M:%S"):
+        for _ in range(250):
+            when = datetime.datetime(2000, 1, 1) + datetime.timedelta(seconds=rng.randrange(10 ** 9))
+            well_known.append(when.strftime(fmt))
+    for example in well_known:
+        parser.parse(example)
+    stats = Counter()
+    start = time.process_time()
+    for example in well_known:
+        parser.parse(example, stats=stats)
+    elapsed = time.process_time() - start
+    print("well-known formats: {:.1f}us/parse, {:.0%} recognized without searching".format(
+        1e6 * elapsed / len(well_known),
+        stats["recognized"] / len(well_known),
+    ))
+
+    start = time.process_time()
+    for example in workload:
+        next(parser.iparse(example), None)
+    elapsed = time.process_time() - start
+    print("iparse: {:.2f}ms/parse to the first result".format(1000 * elapsed / len(workload)))
+    print()
+
+    # Threads share the CPU time they use, so measure wall-clock time here.
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print("parse_many with the GIL {}, {} CPUs:".format("enabled" if gil else "disabled", os.cpu_count()))
+    baseline = None
+    for threads in (1, 2, 4, 8):
+        start = time.perf_counter()
+        parser.parse_many(workload, threads=threads)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = elapsed
+        print("{} threads: {:.0f} parses/s, {:.2f}x".format(threads, len(workload) / elapsed, baseline / elapsed))
@@ -0,0 +1,207 @@
+"""
+Learn, from the inputs a :py:class:`~percentagent.DateParser` actually sees,
+which order of conversion categories makes its search smallest.
+
+The parser searches one category at a time: years, then months, and so on.
+Its default order puts the fields every date or time needs first, then
+smaller groups of choices before larger ones, and then pulls forward the
+categories each constraint depends on, so that constraints can prune as
+early as possible. That is a good rule of thumb, but which order actually
+prunes best depends on the inputs. An :py:class:`AdaptivePlanner` keeps
+statistics for each *signature*, the string of categories in the default
+order, about how many search states each order it has tried generated.
+Mostly it uses the best order it knows; sometimes it tries moving one
+category in that order to see if it does better.
+
+The order of the search doesn't change which results the parser finds, and
+the parser puts results back in the order the default plan would have found
+them, so using a planner only changes how long parsing takes.
+"""
+
+from collections import namedtuple
+import json
+import random
+import threading
+
+OrderingStats = namedtuple("OrderingStats", (
+    "ordering",
+    "parses",
+    "generated",
+))
+OrderingStats.__doc__ = """
+What an :py:class:`AdaptivePlanner` knows about one search order.
+
+:param ordering: the order to search categories in, as a string of
+    conversion specifier characters
+:param parses: how many parses have used this order
+:param generated: the mean number of search states generated per parse
+"""
+
+class AdaptivePlanner(object):
+    """
+    Choose search orders for a :py:class:`~percentagent.DateParser`, and
+    learn from how they worked out.
+
+    >>> from percentagent import DateParser, TimeLocaleSet
+    >>> planner = AdaptivePlanner(seed=1)
+    >>> parser = DateParser(TimeLocaleSet(), planner=planner)
+    >>> for _ in range(20):
+    ...     results = parser.parse("2018/01/09")
+    >>> results
+    [('%Y/%m/%d', datetime.date(2018, 1, 9), None), ('%Y/%d/%m', datetime.date(2018, 9, 1), None)]
+    >>> [signature] = planner.statistics()
+    >>> signature
+    'mdyCHMS'
+    >>> sum(stats.parses for stats in planner.statistics()[signature])
+    20
+
+    The statistics can be saved and loaded again in a later run:
+
+    >>> import io
+    >>> f = io.StringIO()
+    >>> planner.save(f)
+    >>> _ = f.seek(0)
+    >>> AdaptivePlanner.load(f).statistics() == planner.statistics()
+    True
+
+    :param float explore: the fraction of parses which try an order that
+        might be worse than the best one known
+    :param int min_parses: how many parses an order must have been tried on
+        before it can replace the default order
+    :param seed: seed for choosing when and what to explore, for
+        reproducible behavior
+    """
+
+    _version = 1
+
+    def __init__(self, explore=0.1, min_parses=5, seed=None):
+        self.explore = explore
+        self.min_parses = min_parses
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # signature -> ordering -> [parses, total states generated]
+        self._stats = {}
+
+    def choose(self, signature):
+        """
+        :param str signature: the categories of one parse's search, in the
+            default order
+        :return: the order to search them in, which is a permutation of
+            `signature`
+        :rtype: str
+        """
+
+        with self._lock:
+            orderings = self._stats.get(signature)
+            if not orderings:
+                return signature
+            best = self._best(signature, orderings)
+            if len(signature) > 1 and self._rng.random() < self.explore:
+                # Before trying anything new, give the most promising order
+                # that hasn't been tried enough yet another chance.
+                parses, generated = orderings[best]
+                best_mean = generated / parses
+                promising = min(
+                    (
+                        (generated / parses, ordering)
+                        for ordering, (parses, generated) in orderings.items()
+                        if parses < self.min_parses and generated / parses < best_mean
+                    ),
+                    default=None,
+                )
+                if promising is not None:
+                    return promising[1]
+
+                # Otherwise, try moving one category somewhere else in the
+                # best order.
+                src, dst = self._rng.sample(range(len(best)), 2)
+                rest = best[:src] + best[src + 1:]
+                return rest[:dst] + best[src] + rest[dst:]
+            return best
+
+    def _best(self, signature, orderings):
+        best = signature
+        best_mean = None
+        for ordering, (parses, generated) in orderings.items():
+            if parses < self.min_parses and ordering != signature:
+                continue
+            mean = generated / parses
+            if best_mean is None or mean < best_mean:
+                best, best_mean = ordering, mean
+        return best
+
+    def record(self, signature, ordering, generated):
+        """
+        Remember how many search states one parse generated.
+
+        :param str signature: as passed to :py:meth:`choose`
+        :param str ordering: the order that parse searched in
+        :param int generated: how many search states it generated
+        """
+
+        with self._lock:
+            stats = self._stats.setdefault(signature, {}).setdefault(ordering, [0, 0])
+            stats[0] += 1
+            stats[1] += generated
+
+    def best(self, signature):
+        """
+        :return: the order that :py:meth:`choose` currently prefers for
+            `signature`, when it's not exploring
+        :rtype: str
+        """
+
+        with self._lock:
+            return self._best(signature, self._stats.get(signature, {}))
+
+    def statistics(self):
+        """
+        :return: for each signature seen so far, what's known about each
+            order tried for it, from fewest states generated to most
+        :rtype: dict(str, list(OrderingStats))
+        """
+
+        with self._lock:
+            return {
+                signature: sorted(
+                    (
+                        OrderingStats(ordering, parses, generated / parses)
+                        for ordering, (parses, generated) in orderings.items()
+                    ),
+                    key=lambda stats: (stats.generated, stats.ordering),
+                )
+                for signature, orderings in self._stats.items()
+            }
+
+    def save(self, f):
+        """
+        Write the statistics gathered so far as JSON.
+
+        :param f: text stream opened for writing
+        """
+
+        with self._lock:
+            json.dump({"version": self._version, "signatures": self._stats}, f, sort_keys=True)
+
+    @classmethod
+    def load(cls, f, **kwargs):
+        """
+        Construct a planner which starts from statistics written by
+        :py:meth:`save`, possibly in an earlier run.
+
+        :param f: text stream opened for reading
+        :param kwargs: as for the constructor
+        """
+
+        data = json.load(f)
+        if data.get("version") != cls._version:
+            raise ValueError("planner statistics were written by an incompatible version of percentagent")
+        planner = cls(**kwargs)
+        planner._stats = {
+            signature: {
+                ordering: [parses, generated]
+                for ordering, (parses, generated) in orderings.items()
+            }
+            for signature, orderings in data["signatures"].items()
+        }
+        return planner
@@ -0,0 +1,83 @@
+"""
+Uniformly random samples of streams too long to keep in memory, for
+:py:mod:`percentagent.columns` and :py:mod:`percentagent.census`.
+"""
+
+class Reservoir(object):
+    """
+    Keep a uniformly random sample of at most `size` values from a stream of
+    unknown length, using constant memory (Vitter's Algorithm R).
+
+    >>> import random
+    >>> rng = random.Random(1)
+    >>> reservoir = Reservoir(3)
+    >>> for value in range(100):
+    ...     reservoir.add(value, rng)
+    >>> reservoir.seen, len(reservoir.values)
+    (100, 3)
+
+    :param int size: how many values to keep
+    """
+
+    __slots__ = ("size", "seen", "values")
+
+    def __init__(self, size):
+        self.size = size
+        #: how many values have been added
+        self.seen = 0
+        #: the values in the sample
+        self.values = []
+
+    def add(self, value, rng):
+        """
+        Add one value from the stream.
+
+        :param random.Random rng: where to get random numbers from
+        """
+
+        self.seen += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            idx = rng.randrange(self.seen)
+            if idx < self.size:
+                self.values[idx] = value
+
+    def merge(self, other, rng):
+        """
+        Combine this sample and a sample of another stream into a uniform
+        sample of both streams.
+
+        >>> import random
+        >>> rng = random.Random(1)
+        >>> a, b = Reservoir(3), Reservoir(3)
+        >>> a.add("a", rng)
+        >>> for value in "bcde":
+        ...     b.add(value, rng)
+        >>> merged = a.merge(b, rng)
+        >>> merged.seen, len(merged.values)
+        (5, 3)
+
+        :param Reservoir other: a sample of the same size
+        :param random.Random rng: where to get random numbers from
+        :rtype: Reservoir
+        """
+
+        merged = Reservoir(self.size)
+        merged.seen = self.seen + other.seen
+        left = list(self.values)
+        right = list(other.values)
+        rng.shuffle(left)
+        rng.shuffle(right)
+        # Draw without replacement as if from the two whole streams. A sample
+        # only holds fewer values than the size if it's the whole stream, so
+        # neither runs out before its stream does.
+        na, nb = self.seen, other.seen
+        while len(merged.values) < merged.size and na + nb:
+            if rng.randrange(na + nb) < na:
+                merged.values.append(left.pop())
+                na -= 1
+            else:
+                merged.values.append(right.pop())
+                nb -= 1
+        return merged
@@ -0,0 +1,115 @@
+"""
+Keep a record of the inputs that a :py:class:`~percentagent.DateParser` was
+slow to parse, along with enough about each parse to see why.
+
+Most timestamps parse quickly, but some inputs are ambiguous enough, or
+contain enough tokens that look like dates, that the search has to explore
+far more states than usual. A :py:class:`SlowLog` is cheap enough to leave
+attached to a parser all the time: a parse that finishes under the threshold
+only costs reading the clock twice. Everything else in a :py:class:`SlowParse`
+record is worked out afterward, and only for parses that were over the
+threshold.
+"""
+
+from collections import deque, namedtuple
+import threading
+
+SlowParse = namedtuple("SlowParse", (
+    "input",
+    "elapsed",
+    "results",
+    "segments",
+    "groups",
+    "expanded",
+    "generated",
+    "recognized",
+    "trace",
+))
+SlowParse.__doc__ = """
+One parse that took longer than a :py:class:`SlowLog`'s threshold.
+
+:param str input: the string that was parsed
+:param float elapsed: how long the parse took, in seconds
+:param int results: how many results the parse found
+:param segments: how the input was split into tokens: literal text between
+    tokens at even indexes, and the tokens themselves at odd indexes
+:type segments: tuple(str)
+:param groups: each category of conversion the search considered, with how
+    many choices there were for it, in the order the search assigned them
+:type groups: tuple(tuple(str, int))
+:param int expanded: how many search states were expanded
+:param int generated: how many search states were generated
+:param bool recognized: whether the input had a well-known format, so the
+    parse needed no search of its own
+:param trace: if the log asked for one, the first states the search
+    expanded, searching again in the parser's default order: for each, the
+    category it chose next, the best score it could lead to, and how many
+    other states were waiting to be explored; otherwise :py:obj:`None`
+:type trace: tuple(tuple(str, int, int)) or None
+"""
+
+class SlowLog(object):
+    """
+    Remember the most recent parses that took longer than `threshold`.
+
+    >>> from percentagent import DateParser, TimeLocaleSet
+    >>> log = SlowLog(threshold=0, trace=3)
+    >>> parser = DateParser(TimeLocaleSet(), slow_log=log)
+    >>> parser.parse("2018/01/09")
+    [('%Y/%m/%d', datetime.date(2018, 1, 9), None), ('%Y/%d/%m', datetime.date(2018, 9, 1), None)]
+    >>> [record] = log.records()
+    >>> record.input, record.results
+    ('2018/01/09', 2)
+    >>> record.segments[1::2]
+    ('20', '18', '/', '01', '/', '09')
+    >>> record.groups
+    (('m', 2), ('d', 4), ('y', 4), ('C', 4), ('H', 4), ('M', 4), ('S', 4))
+    >>> len(record.trace)
+    3
+
+    :param float threshold: how long, in seconds, a parse may take without
+        being recorded
+    :param int size: how many records to keep; older ones are forgotten
+    :param sink: if provided, a function to call with each new
+        :py:class:`SlowParse` record, such as a logger method
+    :param int trace: how many steps of the search to include in each
+        record's ``trace``; tracing searches again, so it makes recording
+        a slow parse cost about as much as that parse did
+    """
+
+    def __init__(self, threshold=0.01, size=100, sink=None, trace=0):
+        self.threshold = threshold
+        self.sink = sink
+        self.trace = trace
+        self._records = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        """
+        Remember one :py:class:`SlowParse`, and pass it to the sink.
+        """
+
+        with self._lock:
+            self._records.append(record)
+        if self.sink is not None:
+            self.sink(record)
+
+    def records(self):
+        """
+        :return: the records currently kept, oldest first
+        :rtype: list(SlowParse)
+        """
+
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        """
+        Forget all records kept so far.
+        """
+
+        with self._lock:
+            self._records.clear()
+
+    def __len__(self):
+        return len(self._records)
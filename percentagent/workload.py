@@ -0,0 +1,384 @@
+#!/usr/bin/env python
+
+"""
+Generate synthetic timestamps, in many languages, whose format and value are
+known in advance.
+
+The generator renders random datetimes through the sample format strings of
+each locale in a locale database such as ``locales/glibc.json``, using that
+locale's names for days, months, and so on. Each row also records what
+:py:meth:`DateParser.parse` should report for it, so the same rows serve as a
+throughput benchmark and as a check that optimizations don't change results.
+"""
+
+from collections import defaultdict, namedtuple
+import datetime
+import json
+from pkg_resources import resource_stream
+import random
+import re
+
+WorkloadRow = namedtuple("WorkloadRow", (
+    "string",
+    "format",
+    "value",
+    "locale",
+))
+WorkloadRow.__doc__ = """
+One generated timestamp.
+
+:param string: the rendered timestamp
+:param format: the format string :py:meth:`DateParser.parse` should report
+    for it among its results; conversions with several spellings are
+    normalized the way the parser reports them, such as ``%e`` to ``%d``
+:param value: the :py:class:`datetime.datetime`, :py:class:`datetime.date`,
+    or :py:class:`datetime.time` that was rendered, timezone-aware if the
+    format includes a timezone
+:param locale: the locale whose sample format and names were used
+"""
+
+# Timezone abbreviations which have only ever stood for one UTC offset, so a
+# timestamp which uses them has an unambiguous value.
+_zones = tuple(
+    (name, datetime.timezone(datetime.timedelta(hours=hours), name))
+    for name, hours in (
+        ("UTC", 0),
+        ("GMT", 0),
+        ("EST", -5),
+        ("EDT", -4),
+        ("AKST", -9),
+        ("CET", 1),
+        ("EET", 2),
+        ("WIB", 7),
+        ("AWST", 8),
+        ("JST", 9),
+        ("AEST", 10),
+    )
+)
+
+class Workload(object):
+    """
+    Random timestamps rendered through the formats of a locale database.
+
+    The parameters are the same as for :py:class:`TimeLocaleSet`, so
+    ``Workload(**json.load(f))`` works on the output of ``utils/lc_time``,
+    plus these:
+
+    :param locales: which locales to draw rows from: a collection of locale
+        names to weight equally, a mapping from locale names to relative
+        weights, or :py:obj:`None` for every locale with a usable format
+    :param datetime.datetime start: earliest value to generate
+    :param datetime.datetime end: latest value to generate
+
+    >>> workload = Workload(
+    ...     formats={"%a %d %b %Y %H:%M": ["en_US"], "%Y-%m-%d": ["sv_SE"]},
+    ...     day={"Sun;Mon;Tue;Wed;Thu;Fri;Sat": ["en_US"]},
+    ...     mon={"Jan;Feb;Mar;Apr;May;Jun;Jul;Aug;Sep;Oct;Nov;Dec": ["en_US"]},
+    ... )
+    >>> for row in workload.rows(2, seed=1):
+    ...     print(row)
+    WorkloadRow(string='Fri 19 Sep 2003 13:12', format='%a %d %b %Y %H:%M', value=datetime.datetime(2003, 9, 19, 13, 12), locale='en_US')
+    WorkloadRow(string='2036-06-06', format='%Y-%m-%d', value=datetime.date(2036, 6, 6), locale='sv_SE')
+
+    Formats which use conversions that :py:class:`DateParser` doesn't
+    understand, such as era-based years, or which need names that the
+    locale doesn't define, are skipped.
+
+    Two-digit years are generated in the window that the POSIX rule maps
+    them to by default, 1969 through 2068. Where a weekday name appears too,
+    the parser may also report a different century with the same weekday.
+    """
+
+    _conversion = re.compile(r'%([-_0^#]?)\d*([EO]?)([a-zA-Z%+])')
+    _whitespace = re.compile(r'\s+')
+
+    # Conversion characters, mapped to how DateParser reports them.
+    _reported = {
+        'a': 'a', 'A': 'a',
+        'b': 'b', 'B': 'b', 'h': 'b',
+        'd': 'd', 'e': 'd',
+        'm': 'm',
+        'y': 'y',
+        'Y': 'Y',
+        'C': 'C',
+        'H': 'H', 'I': 'H', 'k': 'H', 'l': 'H',
+        'M': 'M',
+        'S': 'S',
+        'p': 'p', 'P': 'p',
+        'Z': 'Z',
+        'z': 'z',
+    }
+
+    def __init__(self, formats=None, day=None, mon=None, am_pm=None, alt_digits=None, era=None, locales=None, start=datetime.datetime(1969, 1, 1), end=datetime.datetime(2068, 12, 31, 23, 59, 59)):
+        names = defaultdict(lambda: defaultdict(list))
+        for key, d in (("day", day), ("mon", mon), ("am_pm", am_pm), ("alt_digits", alt_digits)):
+            for v, in_locales in (d or {}).items():
+                words = [word.strip() for word in v.split(";")]
+                for locale in in_locales:
+                    names[locale][key].append(words)
+
+        by_locale = defaultdict(list)
+        for fmt, in_locales in (formats or {}).items():
+            for locale in in_locales:
+                renderer = self._compile(fmt, names[locale])
+                if renderer is not None:
+                    by_locale[locale].append(renderer)
+
+        if locales is None:
+            weights = dict.fromkeys(by_locale, 1)
+        elif hasattr(locales, "items"):
+            weights = dict(locales)
+        else:
+            weights = dict.fromkeys(locales, 1)
+
+        self._locales = [locale for locale in sorted(weights) if by_locale.get(locale) and weights[locale] > 0]
+        if not self._locales:
+            raise ValueError("none of the requested locales have a usable format")
+        self._weights = [weights[locale] for locale in self._locales]
+        self._renderers = [by_locale[locale] for locale in self._locales]
+
+        self.start = start
+        self.end = end
+
+    @classmethod
+    def default(cls, provider="glibc", **kwargs):
+        """
+        Generate timestamps from a locale database that was distributed with
+        this package. Other keyword arguments are passed to the constructor.
+        """
+
+        path = "locales/{}.json".format(provider)
+        with resource_stream(__name__, path) as f:
+            return cls(**json.load(f), **kwargs)
+
+    @property
+    def locales(self):
+        """
+        The locales that rows are drawn from.
+        """
+        return tuple(self._locales)
+
+    def _compile(self, fmt, names):
+        """
+        Turn one sample format string into a list of literal strings and
+        functions which render a field of a datetime, for one locale.
+
+        :return: the list; whether the format contains a date, a time,
+            seconds, and a timezone; whether only hours 1 to 12 can be told
+            apart; or :py:obj:`None` if the format can't be rendered or parsed
+        """
+
+        # The longest list of names is presumably the unabbreviated one.
+        days = sorted((words for words in names.get("day", ()) if len(words) == 7), key=lambda words: sum(map(len, words)))
+        mons = sorted((words for words in names.get("mon", ()) if len(words) == 12), key=lambda words: sum(map(len, words)))
+        am_pm = names.get("am_pm")
+        alt_digits = names.get("alt_digits")
+        alt_digits = alt_digits[0] if alt_digits else ()
+
+        parts = []
+        categories = set()
+        pos = 0
+        for match in self._conversion.finditer(fmt):
+            parts.append(fmt[pos:match.start()])
+            pos = match.end()
+            flag, modifier, conversion = match.groups()
+
+            if conversion in "nt%":
+                parts.append({"n": "\n", "t": "\t", "%": "%"}[conversion])
+                continue
+            reported = self._reported.get(conversion)
+            if reported is None or modifier == "E":
+                return None
+            categories.add(reported)
+
+            if conversion in "aA":
+                if not days:
+                    return None
+                words = days[0 if conversion == "a" else -1]
+                parts.append((lambda words: lambda dt: (words[(dt.weekday() + 1) % 7], "%a"))(words))
+            elif conversion in "bBh":
+                if not mons:
+                    return None
+                words = mons[-1 if conversion == "B" else 0]
+                parts.append((lambda words: lambda dt: (words[dt.month - 1], "%b"))(words))
+            elif conversion in "pP":
+                if not am_pm or modifier:
+                    return None
+                words = am_pm[0]
+                if conversion == "P":
+                    words = [word.lower() for word in words]
+                parts.append((lambda words: lambda dt: (words[dt.hour >= 12], "%p"))(words))
+            elif conversion == "Z":
+                parts.append(lambda dt: (dt.tzname(), "%Z"))
+            elif conversion == "z":
+                parts.append(self._render_offset)
+            else:
+                parts.append(self._number(conversion, reported, flag, modifier == "O" and alt_digits))
+        parts.append(fmt[pos:])
+
+        date_present = not categories.isdisjoint("aCymdbY")
+        time_present = not categories.isdisjoint("HMSpZz")
+        if date_present and ("d" not in categories or categories.isdisjoint("mb") or categories.isdisjoint("yY")):
+            return None
+        if time_present and not categories.issuperset("HM"):
+            return None
+        if not (date_present or time_present):
+            return None
+
+        # Some locales have 12-hour formats but no AM/PM strings, so the
+        # displayed hour is the only hour anyone can read back.
+        twelve_hour = "p" not in categories and any(
+            match.group(3) in "Il" for match in self._conversion.finditer(fmt)
+        )
+
+        return parts, date_present, time_present, "S" in categories, not categories.isdisjoint("Zz"), twelve_hour
+
+    _fields = {
+        'd': (lambda dt: dt.day, "0"),
+        'e': (lambda dt: dt.day, " "),
+        'm': (lambda dt: dt.month, "0"),
+        'y': (lambda dt: dt.year % 100, "0"),
+        'Y': (lambda dt: dt.year, ""),
+        'C': (lambda dt: dt.year // 100, "0"),
+        'H': (lambda dt: dt.hour, "0"),
+        'I': (lambda dt: (dt.hour + 11) % 12 + 1, "0"),
+        'k': (lambda dt: dt.hour, " "),
+        'l': (lambda dt: (dt.hour + 11) % 12 + 1, " "),
+        'M': (lambda dt: dt.minute, "0"),
+        'S': (lambda dt: dt.second, "0"),
+    }
+
+    @classmethod
+    def _number(cls, conversion, reported, flag, alt_digits):
+        field, pad = cls._fields[conversion]
+        if flag == "-" or conversion == "Y":
+            pad = ""
+        elif flag == "_":
+            pad = " "
+        elif flag == "0":
+            pad = "0"
+        width = 2 if pad else 0
+        plain = "%" + reported
+        alternate = "%O" + reported
+
+        def render(dt):
+            value = field(dt)
+            if alt_digits and value < len(alt_digits):
+                return alt_digits[value], alternate
+            return str(value).rjust(width, pad or " "), plain
+        return render
+
+    @staticmethod
+    def _render_offset(dt):
+        minutes = int(dt.utcoffset().total_seconds()) // 60
+        sign = "-" if minutes < 0 else "+"
+        return "{}{:02}{:02}".format(sign, abs(minutes) // 60, abs(minutes) % 60), "%z"
+
+    def rows(self, count, seed=None):
+        """
+        Generate `count` rows. Rows are drawn from the locale mix, then from
+        the sample formats of the chosen locale, with values chosen uniformly
+        between :py:attr:`start` and :py:attr:`end`.
+
+        :param int count: number of rows to generate
+        :param seed: seed for the random choices; the same seed, locale
+            database, and parameters always produce the same rows
+        :rtype: iterator(WorkloadRow)
+        """
+
+        rng = random.Random(seed)
+        start = self.start
+        span = int((self.end - self.start).total_seconds()) + 1
+        timedelta = datetime.timedelta
+        whitespace = self._whitespace.sub
+        choices = rng.choices
+        choice = rng.choice
+        randrange = rng.randrange
+        locale_ids = choices(range(len(self._locales)), self._weights, k=count)
+
+        for locale_id in locale_ids:
+            parts, date_present, time_present, seconds, zoned, twelve_hour = choice(self._renderers[locale_id])
+            dt = start + timedelta(seconds=randrange(span))
+            if not seconds:
+                dt = dt.replace(second=0)
+            if twelve_hour:
+                dt = dt.replace(hour=(dt.hour + 11) % 12 + 1)
+            if zoned:
+                dt = dt.replace(tzinfo=choice(_zones)[1])
+
+            rendered = []
+            expected = []
+            literal = []
+            for part in parts:
+                if part.__class__ is str:
+                    rendered.append(part)
+                    literal.append(part)
+                    continue
+                text, fmt = part(dt)
+                rendered.append(text)
+                # Padding is literal text as far as the parser can tell.
+                stripped = text.lstrip()
+                literal.append(text[:len(text) - len(stripped)])
+                expected.append(whitespace(" ", "".join(literal)))
+                expected.append(fmt)
+                literal = []
+            expected.append(whitespace(" ", "".join(literal)))
+
+            if date_present and time_present:
+                value = dt
+            elif date_present:
+                value = dt.date()
+            else:
+                value = dt.timetz()
+
+            yield WorkloadRow(
+                string="".join(rendered),
+                format="".join(expected).replace("%C%y", "%Y"),
+                value=value,
+                locale=self._locales[locale_id],
+            )
+
+if __name__ == "__main__":
+    import argparse
+    import csv
+    import sys
+    import time
+
+    argparser = argparse.ArgumentParser(description="Generate synthetic timestamps with known formats and values.")
+    argparser.add_argument("count", type=int)
+    argparser.add_argument("--provider", default="glibc")
+    argparser.add_argument("--seed", type=int)
+    argparser.add_argument("--locale", metavar="NAME[=WEIGHT]", action="append", help="draw rows from this locale, optionally weighted; may be repeated (default: all locales, equally)")
+    argparser.add_argument("--check", action="store_true", help="instead of printing rows, report generation speed and how often DateParser finds the expected result")
+    args = argparser.parse_args()
+
+    mix = None
+    if args.locale:
+        mix = {}
+        for spec in args.locale:
+            name, _, weight = spec.partition("=")
+            mix[name] = float(weight or 1)
+
+    workload = Workload.default(args.provider, locales=mix)
+
+    if not args.check:
+        writer = csv.writer(sys.stdout, delimiter="\t", lineterminator="\n")
+        for row in workload.rows(args.count, args.seed):
+            writer.writerow((row.string, row.format, row.value.isoformat(), row.locale))
+        raise SystemExit
+
+    from percentagent import DateParser
+
+    start = time.perf_counter()
+    rows = list(workload.rows(args.count, args.seed))
+    elapsed = time.perf_counter() - start
+    print("generated {} rows in {:.2f}s ({:.2f}us/row)".format(len(rows), elapsed, elapsed / len(rows) * 1e6))
+
+    parser = DateParser()
+    found = 0
+    start = time.perf_counter()
+    for row in rows:
+        if any(fmt == row.format and value == row.value for fmt, value, _ in parser.parse(row.string)):
+            found += 1
+    elapsed = time.perf_counter() - start
+    print("parsed in {:.2f}s ({:.2f}ms/row); expected result found for {:.1%}".format(elapsed, elapsed / len(rows) * 1e3, found / len(rows)))